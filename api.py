@@ -0,0 +1,256 @@
+# api.py
+# API בפורמט JSON לאפליקציית המובייל (גרסה 1): משמרות, פרטי שכר לכמה משמרות בבקשה אחת וסיכומים חודשיים.
+# התשובות דחוסות ב-gzip ונושאות ETag - לקוח ששולח If-None-Match מקבל 304 בלי גוף
+import gzip
+import math
+from datetime import datetime
+from flask import Blueprint, jsonify, request, abort
+from flask_login import login_required, current_user
+from werkzeug.exceptions import HTTPException
+from models import db, Shift, MonthlySummary
+from months import month_key
+from shifts import ShiftOverlap, overlap_guard, shifts_page, find_shift_conflict, shift_pay_details
+from summaries import refresh_shift_months, get_monthly_summary, fill_missing_summaries
+from simulator import MAX_SCENARIOS, parse_rule, simulate
+
+api_v1 = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+MAX_BATCH = 200
+MIN_GZIP_SIZE = 500
+
+
+def conditional_json(payload):
+    response = jsonify(payload)
+    # ETag חלש - אותו תוכן נשלח דחוס או לא דחוס לפי הלקוח
+    response.add_etag(weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@api_v1.after_request
+def compress(response):
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.headers.get('Accept-Encoding', '')):
+        return response
+    data = response.get_data()
+    if len(data) < MIN_GZIP_SIZE:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+@api_v1.errorhandler(HTTPException)
+def json_error(e):
+    return jsonify({'error': e.description}), e.code
+
+
+def shift_json(shift, details=None):
+    data = {
+        'id': shift.id,
+        'date': shift.date.isoformat(),
+        'start_time': shift.start_time.strftime('%H:%M'),
+        'end_time': shift.end_time.strftime('%H:%M'),
+        'note': shift.note,
+    }
+    if details:
+        data.update({
+            'minutes': details['minutes'],
+            'tiers': details['tiers'],
+            'pay': details['pay'],
+            'shabbat_hours': details['shabbat_hours'],
+            'shabbat_premium': details['shabbat_premium'],
+            'total': details['total'],
+        })
+    return data
+
+
+def summary_json(summary):
+    return {
+        'month': summary.month,
+        'shift_count': summary.shift_count,
+        'hours': {
+            '100%': summary.total_hours_100,
+            '125%': summary.total_hours_125,
+            '150%': summary.total_hours_150,
+            '200%': summary.total_hours_200,
+        },
+        'gross': summary.gross_salary,
+        'net': summary.net_salary,
+        'deductions': summary.tax_deductions or {},
+    }
+
+
+def _own_shift(shift_id):
+    shift = db.session.get(Shift, shift_id)
+    if shift is None or shift.user_id != current_user.id:
+        abort(404, 'משמרת לא נמצאה')
+    return shift
+
+
+def _parse_shift(data):
+    if not isinstance(data, dict):
+        abort(400, 'יש לשלוח אובייקט JSON')
+    if data.get('note') is not None and not isinstance(data['note'], str):
+        abort(400, 'הערה חייבת להיות מחרוזת')
+    try:
+        return (
+            datetime.strptime(str(data['date']), '%Y-%m-%d').date(),
+            datetime.strptime(str(data['start_time']), '%H:%M').time(),
+            datetime.strptime(str(data['end_time']), '%H:%M').time(),
+            (data.get('note') or '').strip() or None,
+        )
+    except KeyError as e:
+        abort(400, f'שדה חסר: {e.args[0]}')
+    except ValueError:
+        abort(400, 'תאריך (YYYY-MM-DD) או שעה (HH:MM) לא תקינים')
+
+
+def _save_shift(shift, days):
+    try:
+        with overlap_guard():
+            refresh_shift_months(current_user, days)
+            db.session.commit()
+    except ShiftOverlap as e:
+        abort(409, str(e))
+    return shift
+
+
+@api_v1.route('/shifts')
+@login_required
+def list_shifts():
+    month = request.args.get('month') or month_key(datetime.now())
+    try:
+        datetime.strptime(month, '%Y-%m')
+        after = None
+        if request.args.get('after_date') and request.args.get('after_id'):
+            after = (datetime.strptime(request.args['after_date'], '%Y-%m-%d').date(), int(request.args['after_id']))
+    except ValueError:
+        abort(400, 'פרמטרים לא תקינים')
+
+    shifts, durations, has_next = shifts_page(current_user.id, month, after)
+    items = [dict(shift_json(shift), duration=duration) for shift, duration in zip(shifts, durations)]
+    next_page = {'after_date': shifts[-1].date.isoformat(), 'after_id': shifts[-1].id} if has_next else None
+    return conditional_json({'month': month, 'shifts': items, 'next': next_page})
+
+
+@api_v1.route('/shifts', methods=['POST'])
+@login_required
+def create_shift():
+    shift_date, start_time, end_time, note = _parse_shift(request.get_json(silent=True))
+    conflict = find_shift_conflict(current_user.id, shift_date, start_time, end_time)
+    if conflict:
+        abort(409, conflict)
+
+    shift = Shift(user_id=current_user.id, date=shift_date, start_time=start_time, end_time=end_time, note=note)
+    db.session.add(shift)
+    _save_shift(shift, [shift_date])
+    return jsonify(shift_json(shift)), 201
+
+
+@api_v1.route('/shifts/<int:shift_id>')
+@login_required
+def get_shift(shift_id):
+    shift = _own_shift(shift_id)
+    return conditional_json(shift_json(shift, shift_pay_details(current_user, [shift.id])[shift.id]))
+
+
+@api_v1.route('/shifts/<int:shift_id>', methods=['PUT'])
+@login_required
+def update_shift(shift_id):
+    shift = _own_shift(shift_id)
+    shift_date, start_time, end_time, note = _parse_shift(request.get_json(silent=True))
+    conflict = find_shift_conflict(current_user.id, shift_date, start_time, end_time, exclude_id=shift.id)
+    if conflict:
+        abort(409, conflict)
+
+    old_date = shift.date
+    shift.date, shift.start_time, shift.end_time, shift.note = shift_date, start_time, end_time, note
+    _save_shift(shift, [old_date, shift_date])
+    return jsonify(shift_json(shift))
+
+
+@api_v1.route('/shifts/<int:shift_id>', methods=['DELETE'])
+@login_required
+def delete_shift(shift_id):
+    shift = _own_shift(shift_id)
+    db.session.delete(shift)
+    refresh_shift_months(current_user, [shift.date])
+    db.session.commit()
+    return '', 204
+
+
+# פרטי שכר לכמה משמרות בבקשה אחת: /api/v1/shifts/details?ids=1,2,3
+@api_v1.route('/shifts/details')
+@login_required
+def shifts_details():
+    try:
+        ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        abort(400, 'רשימת מזהים לא תקינה')
+    if not ids:
+        abort(400, 'יש לציין מזהי משמרות')
+    if len(ids) > MAX_BATCH:
+        abort(400, f'ניתן לבקש עד {MAX_BATCH} משמרות בבת אחת')
+
+    details = shift_pay_details(current_user, ids)
+    return conditional_json({
+        'shifts': [shift_json(details[i]['shift'], details[i]) for i in ids if i in details],
+        'missing': [i for i in ids if i not in details],
+    })
+
+
+@api_v1.route('/summaries')
+@login_required
+def list_summaries():
+    year = request.args.get('year', type=int) or datetime.now().year
+    fill_missing_summaries([current_user.id], f'{year:04d}-01', f'{year:04d}-12')
+    summaries = MonthlySummary.query.filter(
+        MonthlySummary.user_id == current_user.id,
+        MonthlySummary.month >= f'{year:04d}-01',
+        MonthlySummary.month <= f'{year:04d}-12'
+    ).order_by(MonthlySummary.month).all()
+    return conditional_json({'year': year, 'summaries': [summary_json(summary) for summary in summaries]})
+
+
+@api_v1.route('/summaries/<month>')
+@login_required
+def get_summary(month):
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        abort(400, 'חודש לא תקין')
+    summary = get_monthly_summary(current_user.id, month)
+    if summary is None:
+        abort(404, 'אין משמרות בחודש זה')
+    return conditional_json(summary_json(summary))
+
+
+# "מה אם": רשת תרחישים על כל היסטוריית המשמרות, למשל
+# {"wages": [40, 50], "rules": [{"name": "law", "work_days": 5}], "cities": ["שלומי", null]}
+# ברירות המחדל - השכר, שבוע העבודה והיישוב של המשתמש
+@api_v1.route('/simulate', methods=['POST'])
+@login_required
+def simulate_pay():
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        abort(400, 'יש לשלוח אובייקט JSON')
+    # מחרוזת הייתה נקראת תו אחרי תו ("40" -> שני תרחישים, 4 ו-0)
+    for key in ('wages', 'rules', 'cities'):
+        if data.get(key) and not isinstance(data[key], list):
+            abort(400, f'{key} חייב להיות רשימה')
+    try:
+        wages = [float(wage) for wage in data.get('wages') or [current_user.hourly_wage or 0.0]]
+        rules = [parse_rule(rule, current_user.work_days_per_week) for rule in data.get('rules') or [{}]]
+        cities = [str(city).strip() if city else None for city in data.get('cities') or [current_user.city]]
+    except (TypeError, ValueError, AttributeError) as e:
+        abort(400, f'פרמטרים לא תקינים: {e}')
+    # float מקבל גם "nan" ו-"inf", שהיו יוצאים כ-JSON לא תקין
+    if not all(math.isfinite(wage) and wage >= 0 for wage in wages):
+        abort(400, 'שכר שעתי חייב להיות מספר סופי ואי-שלילי')
+    if len(wages) * len(rules) * len(cities) > MAX_SCENARIOS:
+        abort(400, f'יותר מ-{MAX_SCENARIOS} תרחישים בבקשה אחת')
+    return jsonify(simulate(current_user, wages, rules, cities))
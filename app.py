@@ -1,48 +1,35 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, session, jsonify
+from flask import Blueprint, current_app, render_template, redirect, url_for, request, flash, session, jsonify, abort, \
+    Response, stream_with_context
 import os
-from dotenv import load_dotenv
-from flask_bootstrap import Bootstrap5
-from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Shift, TaxExemptCity, Child
-from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
-import locale
+from factory import create_script_app
+from models import db, User, Shift, Child
+from payroll import calculate_pay_batch, shift_minutes
+from months import month_key, add_months
+from summaries import refresh_shift_months, refresh_all_months, get_monthly_summary
+from shifts import ShiftOverlap, overlap_guard, shifts_page, latest_shift_month, find_shift_conflict, \
+    shift_pay_details, month_pay_totals
+from cities import get_city_index
+from settlements import resolve_city
+from fragment_cache import cached_fragment
+from user_cache import load_user, reload_user, bump_data_version
+from passwords import PasswordBusy, hash_password, verify_password, needs_rehash
+from exports import EXPORTS, stream_csv, stream_xlsx
+from shift_import import read_csv, read_json, import_shifts
 import calendar
-from datetime import datetime, timedelta, date as dt_date
-from flask_login import LoginManager, login_required, current_user, login_user, logout_user
+from datetime import datetime, date as dt_date
+from flask_login import login_required, current_user, login_user, logout_user
+from markupsafe import Markup
 
-# Load environment variables from .env file
-load_dotenv()
+# דפי האתר. האפליקציה עצמה נבנית ב-create_app (בסוף הקובץ); flask ו-gunicorn (wsgi.py) קוראים לה
+main = Blueprint('main', __name__)
 
-# אתחול Flask
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY')
 
-# אתחול Flask-SQLAlchemy
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('POSTGRES_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db.init_app(app)
-migrate = Migrate(app, db)
-# אתחול Flask-Bootstrap
-bootstrap = Bootstrap5(app)
-
-# אתחול Flask-Login
-login_manager = LoginManager()
-@login_manager.user_loader
-def user_loader(user_id):
-    return User.query.get(int(user_id))
-
-login_manager.init_app(app)
-locale.setlocale(locale.LC_ALL, 'he_IL.UTF-8')
-
-
-@app.route('/')
+@main.route('/')
 def home():
     return render_template('index.html')
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         # קבלת נתוני המשתמש מהטופס
@@ -51,22 +38,37 @@ def login():
         
         if not username or not password:
             flash('אנא מלא את כל השדות', 'danger')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         user = User.query.filter_by(username=username).first()
         if not user:
             flash('שם משתמש לא נמצא', 'danger')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         
-        if user and check_password_hash(user.password, password):
+        try:
+            valid = verify_password(user.password, password)
+        except PasswordBusy:
+            flash('המערכת עמוסה כרגע, אנא נסה שוב בעוד מספר שניות', 'warning')
+            return render_template('login.html'), 503
+
+        if valid and needs_rehash(user.password):
+            # שדרוג שקוף של גיבוב ישן לשיטה הנוכחית - אפשרי רק כאן, כשהסיסמה בידינו.
+            # כשהמאגר עמוס מוותרים על השדרוג (ינוסה שוב בהתחברות הבאה) ולא על ההתחברות
+            try:
+                user.password = hash_password(password)
+                db.session.commit()
+            except PasswordBusy:
+                pass
+
+        if valid:
             flash('התחברת בהצלחה!', 'success')
             login_user(user)
-            return redirect(url_for('home'))
+            return redirect(url_for('main.home'))
         else:
             flash('שם משתמש או סיסמה שגויים', 'danger')
     return render_template('login.html')
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@main.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form['username']
@@ -86,7 +88,11 @@ def register():
             flash('שם המשתמש או האימייל כבר קיימים במערכת', 'danger')
             return render_template('register.html')
 
-        password_hash = generate_password_hash(password, method='pbkdf2:sha256', salt_length=8)
+        try:
+            password_hash = hash_password(password)
+        except PasswordBusy:
+            flash('המערכת עמוסה כרגע, אנא נסה שוב בעוד מספר שניות', 'warning')
+            return render_template('register.html'), 503
 
         try:
             new_user = User(
@@ -98,7 +104,7 @@ def register():
             db.session.commit()
 
             flash('נרשמת בהצלחה! ברוך הבא!', 'success')
-            return redirect(url_for('login'))  # שים לב לשם ה-endpoint לפי ה-blueprint
+            return redirect(url_for('main.login'))  # שים לב לשם ה-endpoint לפי ה-blueprint
 
         except Exception as e:
             print(f"שגיאה בעת רישום: {e}")
@@ -107,16 +113,16 @@ def register():
     return render_template('register.html')
 
 
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     logout_user()
     session.pop('_flashes', None)
     flash('התנתקת בהצלחה!', 'success')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
 
-@app.route('/shifts', methods=['GET', 'POST'])
+@main.route('/shifts', methods=['GET', 'POST'])
 @login_required
 def manage_shifts():
     user = current_user
@@ -128,13 +134,19 @@ def manage_shifts():
 
         if not date_str or not start_time_str or not end_time_str:
             flash('אנא מלא את כל השדות', 'danger')
-            return redirect(url_for('manage_shifts'))
+            return redirect(url_for('main.manage_shifts'))
 
         try:
             shift_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             start_time = datetime.strptime(start_time_str, '%H:%M').time()
-            end_time = datetime.strptime(end_time_str, '%H:%M').time()            
-            
+            end_time = datetime.strptime(end_time_str, '%H:%M').time()
+
+            # משמרת שחופפת למשמרת קיימת הייתה נספרת פעמיים בחישוב השכר
+            conflict = find_shift_conflict(user.id, shift_date, start_time, end_time)
+            if conflict:
+                flash(conflict, 'danger')
+                return redirect(url_for('main.manage_shifts', month=month_key(shift_date)))
+
             new_shift = Shift(
                 user_id=user.id,
                 date=shift_date,
@@ -143,74 +155,76 @@ def manage_shifts():
                 note=note,
                 
             )
-            db.session.add(new_shift)
-            db.session.commit()
+            with overlap_guard():
+                db.session.add(new_shift)
+                # עדכון הסיכום של החודש הרלוונטי בלבד (ושל החודש הבא אם השבוע גולש אליו)
+                refresh_shift_months(user, [shift_date])
+                db.session.commit()
             flash('משמרת נשמרה בהצלחה!', 'success')
+            return redirect(url_for('main.manage_shifts', month=month_key(shift_date)))
+        except ShiftOverlap as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('main.manage_shifts', month=month_key(shift_date)))
         except Exception as e:
+            db.session.rollback()
             flash(f'שגיאה בשמירת המשמרת: {e}', 'danger')
-    
-    shifts = Shift.query.filter_by(user_id=current_user.id).order_by(Shift.date.asc()).all()
-    if not shifts:
+
+    month = request.args.get('month') or latest_shift_month(user.id) or month_key(dt_date.today())
+    try:
+        datetime.strptime(month, '%Y-%m')
+        after = None
+        if request.args.get('after_date') and request.args.get('after_id'):
+            after = (datetime.strptime(request.args['after_date'], '%Y-%m-%d').date(), int(request.args['after_id']))
+    except ValueError:
+        flash('פרמטרים לא תקינים', 'danger')
+        return redirect(url_for('main.manage_shifts'))
+
+    # הטבלה (כולל השאילתות שמאחוריה) נשמרת במטמון הקטעים עד השינוי הבא בנתוני המשתמש
+    def render_table():
+        shifts, durations, has_next = shifts_page(user.id, month, after)
+        table = render_template('_shifts_table.html', shifts=shifts, rows=zip(shifts, durations), has_next=has_next,
+                                month=month, prev_month=add_months(month, -1), next_month=add_months(month, 1),
+                                totals=month_pay_totals(user, month))
+        return table, bool(shifts)
+
+    page = f'{after[0]}:{after[1]}' if after else ''
+    table, has_shifts = cached_fragment(user, f'shifts:{month}:{page}', render_table)
+    if not has_shifts:
         flash('אין משמרות זמינות', 'info')
-    return render_template('shifts.html',user=user, shifts=shifts, get_shift_duration=get_shift_duration)
+    return render_template('shifts.html', table=Markup(table))
 
 
 
 # חישוב משך המשמרת
 def get_shift_duration(shift):
-    if not shift.start_time or not shift.end_time or not shift.date:
-        return "00:00"
-
-    start_dt = datetime.combine(shift.date, shift.start_time)
-    end_dt = datetime.combine(shift.date, shift.end_time)
-
-    # אם שעת הסיום לפני ההתחלה (משמרת חוצה חצות) נוסיף יום לסיום
-    if end_dt < start_dt:
-        end_dt += timedelta(days=1)
-
-    duration = abs(end_dt - start_dt)  # כאן הערך המוחלט 💡
-    total_minutes = duration.total_seconds() // 60
+    total_minutes = shift_minutes(shift)
     hours = int(total_minutes // 60)
     minutes = int(total_minutes % 60)
 
     return f"{hours:02d}:{minutes:02d}"
 
+# עטיפה סקלרית מעל מנוע החישוב הוקטורי: מדרגות יומיות בלבד, בלי הצבירה השבועית -
+# השכר של משמרת שמורה (כולל השבוע שלה) מגיע מ-shift_pay_details
 def calculate_shift_pay(hours, hourly_rate):
-    tiers = {
-        "100%": 0,
-        "125%": 0,
-        "150%": 0,
-        "200%": 0
-    }
-    pay = 0
-
-    if hours <= 8:
-        tiers["100%"] = hours
-        pay += hours * hourly_rate
-    elif hours <= 10:
-        tiers["100%"] = 8
-        tiers["125%"] = hours - 8
-        pay += 8 * hourly_rate + (hours - 8) * hourly_rate * 1.25
-    elif hours <= 12:
-        tiers["100%"] = 8
-        tiers["125%"] = 2
-        tiers["150%"] = hours - 10
-        pay += 8 * hourly_rate + 2 * hourly_rate * 1.25 + (hours - 10) * hourly_rate * 1.5
-    else:
-        tiers["100%"] = 8
-        tiers["125%"] = 2
-        tiers["150%"] = 2
-        tiers["200%"] = hours - 12
-        pay += (
-            8 * hourly_rate +
-            2 * hourly_rate * 1.25 +
-            2 * hourly_rate * 1.5 +
-            (hours - 12) * hourly_rate * 2
-        )
-
-    return round(pay, 2), tiers
-
-@app.route('/delete_shift/<int:shift_id>', methods=['POST'])
+    pay, tiers = calculate_pay_batch([hours], [hourly_rate])
+    return float(pay[0]), {name: float(values[0]) for name, values in tiers.items()}
+
+# ייבוא מרוכז: קובץ CSV בשדה file, או מערך JSON של משמרות בגוף הבקשה
+@main.route('/api/shifts/import', methods=['POST'])
+@login_required
+def import_shifts_api():
+    try:
+        if 'file' in request.files:
+            df = read_csv(request.files['file'])
+        else:
+            df = read_json(request.get_json(silent=True))
+        inserted, report = import_shifts(df, current_user)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'inserted': inserted, 'errors': report}), 400 if report else 200
+
+@main.route('/delete_shift/<int:shift_id>', methods=['POST'])
 @login_required
 def delete_shift(shift_id):
     shift = Shift.query.get_or_404(shift_id)
@@ -218,26 +232,68 @@ def delete_shift(shift_id):
     # בדיקה אם המשתמש הנוכחי הוא הבעלים של המשמרת
     if shift.user_id != current_user.id:
         flash('אין לך הרשאה למחוק משמרת זו', 'danger')
-        return redirect(url_for('manage_shifts'))
+        return redirect(url_for('main.manage_shifts'))
     # מחיקת המשמרת
     db.session.delete(shift)
+    refresh_shift_months(current_user, [shift.date])
     db.session.commit()
     flash('המשמרת נמחקה בהצלחה!', 'success')
-    return redirect(url_for('manage_shifts'))
+    return redirect(url_for('main.manage_shifts', month=month_key(shift.date)))
 
 
 
-@app.route("/personal_info", methods=["GET", "POST"])
+@main.route('/payslip/<month>')
+@login_required
+def payslip(month):
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        flash('חודש לא תקין', 'danger')
+        return redirect(url_for('main.manage_shifts'))
+
+    summary = get_monthly_summary(current_user.id, month)
+    if not summary:
+        flash('אין משמרות בחודש זה', 'info')
+    return render_template('payslip.html', month=month, summary=summary)
+
+
+@main.route('/export/<kind>.<file_format>')
+@login_required
+def export(kind, file_format):
+    if kind not in EXPORTS or file_format not in ('csv', 'xlsx'):
+        abort(404)
+
+    year = request.args.get('year', type=int) or dt_date.today().year
+    header, iter_rows = EXPORTS[kind]
+    rows = iter_rows(year, current_user.id)
+
+    # התשובה נבנית תוך כדי קריאת השורות מהמסד - בלי לטעון את כל השנה לזיכרון
+    if file_format == 'xlsx':
+        body = stream_xlsx(header, rows, f'{kind} {year}')
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = stream_csv(header, rows)
+        mimetype = 'text/csv; charset=utf-8'
+
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={kind}-{year}.{file_format}'})
+
+
+@main.route("/personal_info", methods=["GET", "POST"])
 @login_required
 def personal_info():
     if request.method == "POST":
+        reload_user(current_user.id)
+        pay_inputs = (current_user.hourly_wage, current_user.city, current_user.work_days_per_week)
         current_user.birth_date = request.form["birth_date"]
         current_user.gender = request.form["gender"]
         current_user.marital_status = request.form["marital_status"]
         current_user.city = request.form["city"]
+        current_user.settlement_code = resolve_city(current_user.city)
         current_user.hourly_wage = request.form.get("hourly_wage", type=float) or None
         current_user.has_degree = "has_degree" in request.form
         current_user.degree_year = request.form.get("degree_year") or None
+        current_user.work_days_per_week = 5 if request.form.get("work_days_per_week") == "5" else 6
 
         # מחיקת ילדים ישנים (אם יש)
         Child.query.filter_by(user_id=current_user.id).delete()
@@ -247,37 +303,97 @@ def personal_info():
                 child = Child(birth_date=date, parent=current_user)
                 db.session.add(child)
 
+        # התלושים השמורים תלויים בכל הפרטים (נקודות זיכוי, יישוב) ומתעדכנים יחד איתם; השכר השמור
+        # בשורות המשמרות תלוי רק בשכר השעתי, ביישוב (שבת) ובשבוע העבודה
+        pay_changed = (current_user.hourly_wage, current_user.city, current_user.work_days_per_week) != pay_inputs
+        refresh_all_months(current_user, pay_changed)
+        bump_data_version(current_user.id)
         db.session.commit()
         flash("הפרטים עודכנו בהצלחה!", "success")
-        return redirect(url_for("personal_info"))
+        return redirect(url_for("main.personal_info"))
     current_date = dt_date.today().isoformat()
 
     return render_template("personal_info.html", user=current_user, current_date = current_date
 )
 
-@app.route('/api/cities')
+@main.route('/api/cities')
 def get_cities():
-    cities = TaxExemptCity.query.with_entities(TaxExemptCity.city_name).order_by(TaxExemptCity.city_name).all()
-    city_list = [city[0] for city in cities]
-    return jsonify(city_list)
+    index = get_city_index()
+    prefix = request.args.get('prefix', '').strip()
+
+    if prefix:
+        response = jsonify(index.search(prefix))
+        response.add_etag()
+    else:
+        response = current_app.response_class(index.body, mimetype='application/json')
+        response.set_etag(index.etag)
 
-@app.route('/shift_details/<int:shift_id>', methods=['GET', 'POST'])
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
+
+@main.route('/shift_details/<int:shift_id>', methods=['GET', 'POST'])
 @login_required
 def shift_details(shift_id):
-    shift = Shift.query.get_or_404(shift_id)
-    # בדיקה אם המשתמש הנוכחי הוא הבעלים של המשמרת
-    if shift.user_id != current_user.id:
+    def render_details():
+        shift = Shift.query.get_or_404(shift_id)
+        # בדיקה אם המשתמש הנוכחי הוא הבעלים של המשמרת
+        if shift.user_id != current_user.id:
+            return None
+
+        duration_str = get_shift_duration(shift)
+        # שכר לפי מדרגות (כולל צבירה שבועית) ותוספת שבת/חג לפי חלונות השבת של יישוב המשתמש
+        details = shift_pay_details(current_user, [shift.id])[shift.id]
+        day_of_week = calendar.day_name[shift.date.weekday()]
+        return render_template('_shift_details.html', shift=shift, get_shift_duration=get_shift_duration,
+                               duration_str=duration_str, total_salary=details['total'], tiers=details['tiers'],
+                               day_of_week=day_of_week, shabbat_hours=details['shabbat_hours'],
+                               shabbat_premium=details['shabbat_premium'])
+
+    # המפתח כולל את המשתמש - קטע שנשמר עבורו כבר עבר את בדיקת הבעלות
+    details = cached_fragment(current_user, f'shift:{shift_id}', render_details)
+    if details is None:
         flash('אין לך הרשאה לצפות בפרטי משמרת זו', 'danger')
-        return redirect(url_for('manage_shifts'))
-    
-    duration_str = get_shift_duration(shift)
-    hours, minutes = map(int, duration_str.split(':'))
-    total_hours = hours + minutes / 60
-    total_salary, tiers = calculate_shift_pay(total_hours, current_user.hourly_wage)
-    day_of_week = calendar.day_name[shift.date.weekday()]
-
-    return render_template('shift_details.html', shift=shift,get_shift_duration=get_shift_duration,
-                            duration_str=duration_str, total_salary=round(total_salary, 2), tiers=tiers, day_of_week=day_of_week)
-
-if __name__ == '__main__': 
-    app.run(debug=True)
\ No newline at end of file
+        return redirect(url_for('main.manage_shifts'))
+    return render_template('shift_details.html', details=Markup(details))
+
+
+def create_app():
+    import locale
+    from flask_bootstrap import Bootstrap5
+    from flask_login import LoginManager
+    from api import api_v1
+    from exports import export_cli
+    from instrumentation import init_instrumentation
+    from payroll_run import payroll_cli
+
+    app = create_script_app()
+    app.register_blueprint(main)
+    app.register_blueprint(api_v1)
+    app.cli.add_command(payroll_cli)
+    app.cli.add_command(export_cli)
+    # alembic כבד לייבוא ונדרש רק לפקודות flask db - תהליכי הרשת לא טוענים אותו
+    if os.getenv('FLASK_RUN_FROM_CLI'):
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    # אתחול Flask-Bootstrap
+    Bootstrap5(app)
+
+    # אתחול Flask-Login
+    login_manager = LoginManager()
+    @login_manager.user_loader
+    def user_loader(user_id):
+        return load_user(int(user_id))
+
+    login_manager.init_app(app)
+    locale.setlocale(locale.LC_ALL, 'he_IL.UTF-8')
+
+    if app.config['PROFILING']:
+        init_instrumentation(app)
+    return app
+
+
+# שרת הפיתוח בלבד - בייצור: gunicorn -c gunicorn.conf.py wsgi:app
+if __name__ == '__main__':
+    create_app().run(debug=os.getenv('FLASK_DEBUG') == '1')
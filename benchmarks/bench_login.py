@@ -0,0 +1,112 @@
+# benchmarks/bench_login.py
+# מדידת זמן ותפוקת התחברות לכל מדיניות גיבוב: גל של התחברויות מקבילות דרך /login
+# שימוש: python -m benchmarks.bench_login --policies pbkdf2:sha256:1000000,scrypt:16384:8:1,scrypt:32768:8:1 \
+#            --logins 200 --concurrency 16 --workers 2 --output login.json
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+PASSWORD = "benchmark"
+
+
+def login_burst(app, usernames, logins, concurrency):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(logins))
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            started = time.perf_counter()
+            response = client.post("/login", data={"username": usernames[n % len(usernames)], "password": PASSWORD})
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "logins_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--policies", default="pbkdf2:sha256:1000000,scrypt:16384:8:1,scrypt:32768:8:1")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16, help="בקשות התחברות מקבילות")
+    parser.add_argument("--workers", type=int, default=2, help="תהליכוני גיבוב (PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--queue", type=int, default=0, help="גיבובים ממתינים לפני 503 (PASSWORD_HASH_QUEUE)")
+    parser.add_argument("--output", help="קובץ JSON לתוצאות (ברירת מחדל: stdout)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="salary-bench-")
+    os.environ["POSTGRES_URL"] = f"sqlite:///{os.path.join(workdir, 'login.db')}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_QUEUE"] = str(args.queue)
+
+    from app import create_app
+    from models import db, User
+    from werkzeug.security import generate_password_hash
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    results = []
+    for policy in args.policies.split(","):
+        app.config["PASSWORD_HASH_METHOD"] = policy
+        with app.app_context():
+            User.query.delete()
+            # הגיבובים כבר בשיטה הנוכחית - המדידה היא של אימות בלבד, בלי שדרוג
+            password_hash = generate_password_hash(PASSWORD, policy, app.config["PASSWORD_SALT_LENGTH"])
+            db.session.add_all([
+                User(username=f"user{i}", email=f"user{i}@example.com", password=password_hash)
+                for i in range(args.users)
+            ])
+            db.session.commit()
+            usernames = [row[0] for row in db.session.query(User.username)]
+
+        started = time.perf_counter()
+        generate_password_hash(PASSWORD, policy)
+        result = {"policy": policy, "hash_ms": (time.perf_counter() - started) * 1000}
+        result.update(login_burst(app, usernames, args.logins, args.concurrency))
+        print(f"{policy}: {result['logins_per_second']:.1f} התחברויות/שנייה, p95 {result['p95_ms']:.0f} ms",
+              file=sys.stderr)
+        results.append(result)
+
+    report = {"workers": args.workers, "queue": args.queue, "concurrency": args.concurrency, "logins": args.logins,
+              "results": results}
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
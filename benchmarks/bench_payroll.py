@@ -0,0 +1,129 @@
+# benchmarks/bench_payroll.py
+# מדידת ביצועים של חישובי השכר, הדפים והמייבא על נתונים סינתטיים
+# שימוש: python -m benchmarks.bench_payroll --shifts 100000 --output bench.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from sqlalchemy.engine import make_url
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# setup רץ לפני כל מדידה ולא נכלל בזמן (למשל ניקוי מטמון)
+def timed(fn, repeat, setup=None):
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    return {"median": statistics.median(runs), "min": min(runs), "runs": repeat}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shifts", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", help="כתובת מסד נתונים (ברירת מחדל: קובץ SQLite זמני)")
+    parser.add_argument("--output", help="קובץ JSON לתוצאות (ברירת מחדל: stdout)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="salary-bench-")
+    os.environ["POSTGRES_URL"] = args.database or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    # האפליקציה נבנית רק אחרי שהוגדרה כתובת המסד - create_app קורא אותה מהסביבה
+    from app import create_app, get_shift_duration, calculate_shift_pay
+    from models import db, User, Shift
+    from overtime import weekly_pay_batch
+    from payroll import calculate_pay_batch, minutes_to_hours, shift_minutes_batch
+    from shifts import shift_pay_details
+    import fragment_cache
+    from months import month_key
+    from summaries import refresh_monthly_summary
+    from simulator import parse_rule, simulate
+    from import_tax_cities import file_path, read_cities, upsert_cities
+    from benchmarks.synthetic import populate, PASSWORD
+
+    app = create_app()
+    results = {}
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        user_ids = populate(args.shifts)
+        results["populate"] = {"median": time.perf_counter() - started, "min": None, "runs": 1}
+
+        # בסדר כרונולוגי לכל משתמש - כמו שמנוע השעות הנוספות מצפה לקבל
+        shifts = Shift.query.order_by(Shift.user_id, Shift.date, Shift.start_time).all()
+        user = db.session.get(User, user_ids[0])
+        n = len(shifts)
+
+        results["get_shift_duration"] = timed(lambda: [get_shift_duration(s) for s in shifts], args.repeat)
+        results["shift_minutes_batch"] = timed(
+            lambda: shift_minutes_batch([s.start_time for s in shifts], [s.end_time for s in shifts]), args.repeat)
+
+        hours = minutes_to_hours(shift_minutes_batch([s.start_time for s in shifts], [s.end_time for s in shifts]))
+        hours_list = hours.tolist()
+        results["calculate_shift_pay"] = timed(lambda: [calculate_shift_pay(h, 42.0) for h in hours_list], args.repeat)
+        results["calculate_pay_batch"] = timed(lambda: calculate_pay_batch(hours, 42.0), args.repeat)
+        owners, dates = [s.user_id for s in shifts], [s.date for s in shifts]
+        results["weekly_pay_batch"] = timed(
+            lambda: weekly_pay_batch(owners, dates, hours, 42.0, [6] * n), args.repeat)
+
+        user_shift_ids = [s.id for s in shifts if s.user_id == user.id]
+        results["shift_pay_details"] = timed(lambda: shift_pay_details(user, user_shift_ids), args.repeat)
+
+        # רשת "מה אם": 10 שכרים × 3 כללים × 5 יישובים על כל ההיסטוריה של המשתמש
+        rules = [parse_rule({}, 6), parse_rule({"work_days": 5}, 6),
+                 parse_rule({"name": "flat150", "multipliers": [1, 1.5, 1.5, 1.5]}, 6)]
+        results["simulate_grid"] = timed(
+            lambda: simulate(user, list(range(35, 135, 10)), rules, ["שלומי", "תל אביב", "ירושלים", "אילת", None]),
+            args.repeat)
+
+        user_shift = Shift.query.filter_by(user_id=user.id).first()
+        username, shift_id, month = user.username, user_shift.id, month_key(user_shift.date)
+        refresh_monthly_summary(user, month)
+        db.session.commit()
+
+        cities = read_cities(os.path.join(REPO_DIR, file_path))
+        results["import_tax_cities"] = timed(lambda: (upsert_cities(cities), db.session.commit()), args.repeat)
+
+    client = app.test_client()
+    client.post("/login", data={"username": username, "password": PASSWORD})
+    # בלי המטמון של הקטעים (כל מדידה מרנדרת מחדש), ואחריו - מהמטמון
+    for name, url in (("GET /shifts", f"/shifts?month={month}"), ("GET /shift_details", f"/shift_details/{shift_id}")):
+        results[name] = timed(lambda: client.get(url), args.repeat, setup=fragment_cache.clear)
+        results[f"{name} (cached)"] = timed(lambda: client.get(url), args.repeat)
+    results["GET /payslip"] = timed(lambda: client.get(f"/payslip/{month}"), args.repeat)
+
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "database": make_url(os.environ["POSTGRES_URL"]).get_backend_name(),
+        "shifts": n,
+        "users": len(user_ids),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
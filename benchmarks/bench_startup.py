@@ -0,0 +1,94 @@
+# benchmarks/bench_startup.py
+# זמן עלייה קר של תהליך העובד ושל כל סקריפט: כל מדידה בתהליך פייתון חדש עם python -X importtime,
+# כדי לראות גם את הזמן הכולל וגם אילו מודולים אחראים לו
+# שימוש: python -m benchmarks.bench_startup --repeat 5 --output startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# שם -> (קוד שמריצים בתהליך חדש, משתני סביבה נוספים)
+TARGETS = {
+    "web": ("from wsgi import app", {}),
+    "flask-cli": ("from app import create_app; create_app()", {"FLASK_RUN_FROM_CLI": "true"}),
+    "import_tax_cities": ("import import_tax_cities as m; m.create_script_app().app_context().push()", {}),
+    "import_settlements": ("import import_settlements as m; m.create_script_app().app_context().push()", {}),
+    "check_shabat": ("from shabbat import SHABBAT_FILE, load_indexes", {}),
+}
+
+
+# שורות importtime: "import time: self [us] | cumulative | imported package", כשההזחה של השם היא עומק
+# הייבוא. מחזיר (שם, עצמי, מצטבר, עומק)
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip())) // 2))
+    return modules
+
+
+def measure(code, env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR, env=env,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", default=",".join(TARGETS), help="רשימה מופרדת בפסיקים")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="כמה מודולים כבדים להציג לכל מדידה")
+    parser.add_argument("--output", help="קובץ JSON לתוצאות (ברירת מחדל: stdout)")
+    args = parser.parse_args()
+
+    base_env = dict(os.environ)
+    base_env.setdefault("POSTGRES_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='salary-bench-'), 'startup.db')}")
+    base_env.setdefault("SECRET_KEY", "benchmark")
+
+    results = {}
+    for name in args.targets.split(","):
+        code, extra_env = TARGETS[name]
+        env = dict(base_env, **extra_env)
+        walls, imports = [], []
+        for _ in range(args.repeat):
+            elapsed, modules = measure(code, env)
+            walls.append(elapsed)
+            imports.append(sum(module[1] for module in modules) / 1000)
+
+        # הקוד הנמדד והייבואים הישירים שלו, לפי זמן מצטבר - שם מתחילים לחפש מה לדחות
+        heaviest = sorted((module for module in modules if module[3] <= 1), key=lambda module: module[2],
+                          reverse=True)[:args.top]
+        loaded = {module[0] for module in modules}
+        results[name] = {
+            "wall_ms": statistics.median(walls) * 1000,
+            "import_ms": statistics.median(imports),
+            "modules": len(modules),
+            "heavy_loaded": sorted(loaded & {"pandas", "openpyxl", "alembic", "flask_migrate", "numpy"}),
+            "heaviest_ms": [(module[0], module[2] / 1000) for module in heaviest],
+        }
+        print(f"{name}: {results[name]['wall_ms']:.0f} ms (ייבוא {results[name]['import_ms']:.0f} ms, "
+              f"{len(modules)} מודולים)", file=sys.stderr)
+
+    output = json.dumps({"python": sys.version.split()[0], "repeat": args.repeat, "results": results},
+                        indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
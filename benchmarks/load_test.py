@@ -0,0 +1,166 @@
+# benchmarks/load_test.py
+# בדיקת עומס מול Postgres מקומי: מרים gunicorn בכל שילוב של מספר עובדים וגודל מאגר חיבורים,
+# מפעיל לקוחות מקבילים מחוברים על דפי הרשימה והסיכומים ומודד תפוקה וזמני תגובה
+# שימוש: python -m benchmarks.load_test --database postgresql+psycopg2://localhost/salary_bench \
+#            --workers 1,2,4 --pool-sizes 2,5,10 --concurrency 32 --duration 15 --output load.json
+import argparse
+import http.cookiejar
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = (
+    "/api/v1/shifts?month=2024-01",
+    "/api/v1/summaries?year=2024",
+    "/shifts?month=2024-01",
+)
+
+
+def prepare_database(database, shifts):
+    os.environ["POSTGRES_URL"] = database
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    from app import create_app
+    from models import db, User
+    from benchmarks.synthetic import populate, PASSWORD
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if User.query.filter_by(username="user0").first() is None:
+            populate(shifts)
+            db.session.commit()
+        usernames = [row[0] for row in db.session.query(User.username).filter(User.username.like("user%"))]
+        db.engine.dispose()
+    return usernames, PASSWORD
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_server(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn יצא לפני שהתחיל להאזין")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn לא התחיל להאזין בזמן")
+
+
+def client_loop(base_url, username, password, ready, duration, latencies, errors):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    login = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    try:
+        opener.open(base_url + "/login", data=login).read()
+    finally:
+        # ההתחברות (גיבוב סיסמה איטי) לא נכללת בזמן המדידה
+        ready.wait()
+
+    stop_at = time.monotonic() + duration
+    i = 0
+    while time.monotonic() < stop_at:
+        path = ENDPOINTS[i % len(ENDPOINTS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            opener.open(base_url + path, timeout=30).read()
+            latencies.append(time.perf_counter() - started)
+        except (urllib.error.URLError, OSError):
+            errors.append(path)
+
+
+def run_case(workers, threads, pool_size, concurrency, duration, database, usernames, password):
+    port = free_port()
+    env = dict(os.environ,
+               POSTGRES_URL=database,
+               WEB_WORKERS=str(workers),
+               WEB_THREADS=str(threads),
+               DB_POOL_SIZE=str(pool_size),
+               DB_MAX_OVERFLOW="0",
+               BIND=f"127.0.0.1:{port}",
+               ACCESS_LOG="")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_server(port, process)
+        latencies, errors = [], []
+        ready = threading.Barrier(concurrency + 1)
+        clients = [
+            threading.Thread(target=client_loop, args=(f"http://127.0.0.1:{port}", usernames[i % len(usernames)],
+                                                       password, ready, duration, latencies, errors))
+            for i in range(concurrency)
+        ]
+        for client in clients:
+            client.start()
+        ready.wait()
+        started = time.perf_counter()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    latencies.sort()
+    return {
+        "workers": workers,
+        "threads": threads,
+        "pool_size": pool_size,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", required=True, help="כתובת Postgres מקומי (לא מסד הייצור)")
+    parser.add_argument("--shifts", type=int, default=20000)
+    parser.add_argument("--workers", default="1,2,4", help="רשימת מספרי עובדים")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--pool-sizes", default="2,5,10", help="רשימת גדלי מאגר חיבורים לכל עובד")
+    parser.add_argument("--concurrency", type=int, default=32, help="לקוחות מקבילים")
+    parser.add_argument("--duration", type=float, default=15.0, help="שניות לכל שילוב")
+    parser.add_argument("--output", help="קובץ JSON לתוצאות (ברירת מחדל: stdout)")
+    args = parser.parse_args()
+
+    usernames, password = prepare_database(args.database, args.shifts)
+    results = []
+    for workers in [int(value) for value in args.workers.split(",")]:
+        for pool_size in [int(value) for value in args.pool_sizes.split(",")]:
+            result = run_case(workers, args.threads, pool_size, args.concurrency, args.duration,
+                              args.database, usernames, password)
+            print(f"workers={workers} pool={pool_size}: {result['throughput_rps']:.1f} req/s, "
+                  f"p95 {result['p95_ms'] or 0:.1f} ms, {result['errors']} שגיאות", file=sys.stderr)
+            results.append(result)
+
+    report = {"concurrency": args.concurrency, "duration": args.duration, "endpoints": ENDPOINTS, "results": results}
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
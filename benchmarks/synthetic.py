@@ -0,0 +1,62 @@
+# benchmarks/synthetic.py
+# יצירת אוכלוסייה סינתטית של משתמשים, משמרות וילדים לבדיקות ביצועים
+import random
+from datetime import date, time, timedelta
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from models import db, User, Shift, Child
+
+PASSWORD = "benchmark"
+SHIFTS_PER_USER = 40
+CHUNK_SIZE = 10000
+START_DATE = date(2024, 1, 1)
+
+
+def populate(shifts, shifts_per_user=SHIFTS_PER_USER, seed=0):
+    rng = random.Random(seed)
+    users = max(1, shifts // shifts_per_user)
+    password_hash = generate_password_hash(PASSWORD, method='pbkdf2:sha256', salt_length=8)
+
+    db.session.execute(insert(User.__table__), [
+        {
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "password": password_hash,
+            "city": rng.choice(["ירושלים", "באר שבע", "אופקים", "חיפה"]),
+            "hourly_wage": float(rng.randint(30, 120)),
+            "tax_credit_points": 2.25,
+            "has_degree": rng.random() < 0.3,
+            "deductions": {},
+        }
+        for i in range(users)
+    ])
+    user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+
+    children = []
+    for user_id in user_ids:
+        for _ in range(rng.randint(0, 3)):
+            children.append({"user_id": user_id, "birth_date": START_DATE - timedelta(days=rng.randint(0, 6000))})
+    if children:
+        db.session.execute(insert(Child.__table__), children)
+
+    rows = []
+    for n in range(shifts):
+        user_id = user_ids[n % len(user_ids)]
+        start = rng.randint(0, 23 * 4) * 15
+        length = rng.randint(4 * 4, 14 * 4) * 15
+        end = (start + length) % (24 * 60)
+        rows.append({
+            "user_id": user_id,
+            "date": START_DATE + timedelta(days=n // len(user_ids)),
+            "start_time": time(start // 60, start % 60),
+            "end_time": time(end // 60, end % 60),
+            "note": None,
+        })
+        if len(rows) == CHUNK_SIZE:
+            db.session.execute(insert(Shift.__table__), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Shift.__table__), rows)
+
+    db.session.commit()
+    return user_ids
@@ -0,0 +1,142 @@
+# cache.py
+# מטמונים קטנים לשימוש חוזר: LRU בזיכרון התהליך עם תוקף (TTL) ומגבלת גודל,
+# ו-backend משותף ב-Redis כשכמה תהליכי עבודה צריכים לראות את אותו מטמון
+import json
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from flask import current_app
+
+
+class LRUCache:
+    # כל תהליך רואה רק את המטמון שלו - מחיקה בתהליך אחד לא מגיעה לאחרים
+    shared = False
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+# הערכים נשמרים כ-JSON ולא כ-pickle - קריאה מהמטמון לא יכולה להריץ קוד. לכן רק ערכים פשוטים
+# (מחרוזות, מספרים, רשימות ומילונים; tuple חוזר כרשימה).
+# הפינוי לפי גודל נעשה ע"י Redis עצמו (maxmemory-policy allkeys-lru)
+class RedisCache:
+    shared = True
+
+    def __init__(self, url, prefix, ttl=60):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return json.loads(data) if data is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+# url ריק - מטמון בזיכרון התהליך; אחרת Redis משותף (דורש את החבילה redis)
+def make_cache(url, prefix, maxsize=1024, ttl=60):
+    if url:
+        return RedisCache(url, prefix, ttl)
+    return LRUCache(maxsize, ttl)
+
+
+# מטמון לפי הגדרות האפליקציה <name>_URL, <name>_SIZE ו-<name>_TTL, שנבנה בשימוש הראשון
+class ConfiguredCache:
+    def __init__(self, name, prefix):
+        self.name = name
+        self.prefix = prefix
+        self._cache = None
+
+    def __call__(self):
+        if self._cache is None:
+            config = current_app.config
+            self._cache = make_cache(config.get(f'{self.name}_URL'), self.prefix,
+                                     config.get(f'{self.name}_SIZE', 1024), config.get(f'{self.name}_TTL', 60))
+        return self._cache
+
+    def clear(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+
+# קובץ חותמת: מי שמעדכן את המקור (סקריפט ייבוא) נוגע בקובץ, וכל תהליך משווה את זמן השינוי שלו
+def touch_stamp(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a'):
+        os.utime(path, None)
+
+
+def _file_stamp(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+# ערך שנטען פעם אחת לכל תהליך ונטען מחדש כשהחותמת משתנה. path - פונקציה שמחזירה את נתיב החותמת
+# (למשל בתוך instance_path של האפליקציה הנוכחית)
+class StampedValue:
+    def __init__(self, path, load):
+        self.path = path
+        self.load = load
+        self._value = None
+        self._lock = Lock()
+
+    def get(self):
+        stamp = _file_stamp(self.path())
+        value = self._value
+        if value is None or value[0] != stamp:
+            with self._lock:
+                if self._value is None or self._value[0] != stamp:
+                    self._value = (stamp, self.load())
+                value = self._value
+        return value[1]
+
+    def invalidate(self):
+        touch_stamp(self.path())
+        self._value = None
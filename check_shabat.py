@@ -1,13 +1,10 @@
-import pandas as pd
-from app import app, db  # מייבא את האפליקציה ואת מסד הנתונים שלך
-from models import Shift  # מייבא את המודל של הטבלה החדשה
+from shabbat import SHABBAT_FILE, load_indexes
 
-file_patch = "shabat_times_2025.xlsx"
-# קריאה לקובץ ה-Excel
-df = pd.read_excel(file_patch)
-
-# הדפסת הקריאה מהקובץ
+# בניית אינדקס חלונות השבת/חג מהקובץ ובדיקה שהוא נטען כראוי
 # date - תאריכי החגים/שבתות
 # Jerusalem_in - זמני כניסת שבת בירושלים
 # Jerusalem_out - זמני יציאת שבת בירושלים
+indexes = load_indexes(SHABBAT_FILE)
 
+for zone, index in indexes.items():
+    print(f"{zone}: {len(index.starts)} חלונות שבת/חג")
@@ -0,0 +1,41 @@
+# cities.py
+# מטמון בזיכרון של רשימת היישובים עבור /api/cities
+# הרשימה משתנה רק כש-import_tax_cities.py רץ, ולכן נטענת פעם אחת ונשמרת בזיכרון עד לעדכון הבא
+import hashlib
+import json
+import os
+from bisect import bisect_left
+from flask import current_app
+from cache import StampedValue
+from models import TaxExemptCity
+
+
+class CityIndex:
+    def __init__(self, names):
+        self.names = sorted(names)
+        self.body = json.dumps(self.names, ensure_ascii=False).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()
+
+    # חיפוש לפי תחילית על הרשימה הממוינת - O(log n) עד התוצאה הראשונה
+    def search(self, prefix):
+        start = bisect_left(self.names, prefix)
+        end = start
+        while end < len(self.names) and self.names[end].startswith(prefix):
+            end += 1
+        return self.names[start:end]
+
+
+def _load_city_index():
+    return CityIndex([row[0] for row in TaxExemptCity.query.with_entities(TaxExemptCity.city_name).all()])
+
+
+# קובץ חותמת שהמייבא נוגע בו - כך גם תהליכי web אחרים יודעים שהמטמון ישן
+_index = StampedValue(lambda: os.path.join(current_app.instance_path, 'cities.stamp'), _load_city_index)
+
+
+def get_city_index():
+    return _index.get()
+
+
+def invalidate_city_cache():
+    _index.invalidate()
@@ -0,0 +1,254 @@
+# exports.py
+# ייצוא שנתי של משמרות ותלושים ל-CSV/XLSX בהזרמה: השורות נקראות מהמסד במנות (yield_per),
+# מחושבות מנה אחר מנה ונכתבות מיד - הזיכרון לא גדל עם מספר המשמרות
+import calendar
+import csv
+import io
+import re
+import zipfile
+from datetime import date
+from xml.sax.saxutils import escape as xml_escape
+import click
+import numpy as np
+from flask.cli import AppGroup
+from models import db, User, Shift, MonthlySummary
+from overtime import OvertimeStream, week_start
+from payroll import minutes_to_hours, shabbat_premium_batch, shift_minutes_batch, shift_start_minutes_batch, \
+    format_duration
+from shabbat import city_zone, shabbat_minutes_by_zone
+from summaries import fill_missing_summaries
+
+CHUNK_SIZE = 1000
+
+SHIFT_HEADER = ['משתמש', 'תאריך', 'יום', 'התחלה', 'סיום', 'משך', 'שעות 100%', 'שעות 125%',
+                'שעות 150%', 'שעות 200%', 'שעות שבת/חג', 'שכר שעתי', 'ברוטו', 'הערה']
+PAYSLIP_HEADER = ['משתמש', 'חודש', 'משמרות', 'שעות 100%', 'שעות 125%', 'שעות 150%', 'שעות 200%',
+                  'ברוטו', 'מס הכנסה', 'ביטוח לאומי', 'נטו']
+
+export_cli = AppGroup('export', help='ייצוא משמרות ותלושים')
+
+
+def _shift_chunk_rows(chunk, overtime, first_day):
+    minutes = shift_minutes_batch([row.start_time for row in chunk], [row.end_time for row in chunk])
+    wages = np.array([row.hourly_wage or 0.0 for row in chunk], dtype=float)
+    pay, tiers = overtime.pay([row.user_id for row in chunk], [row.date for row in chunk],
+                              minutes_to_hours(minutes), wages, [row.work_days_per_week for row in chunk])
+    start_minutes = shift_start_minutes_batch([row.date for row in chunk], [row.start_time for row in chunk])
+    shabbat = shabbat_minutes_by_zone([city_zone(row.city) for row in chunk], start_minutes, minutes)
+    gross = pay + shabbat_premium_batch(shabbat, wages)
+
+    for i, row in enumerate(chunk):
+        if row.date < first_day:
+            continue
+        yield [
+            row.username,
+            row.date.isoformat(),
+            calendar.day_name[row.date.weekday()],
+            row.start_time.strftime('%H:%M'),
+            row.end_time.strftime('%H:%M'),
+            format_duration(minutes[i]),
+            round(float(tiers['100%'][i]), 2),
+            round(float(tiers['125%'][i]), 2),
+            round(float(tiers['150%'][i]), 2),
+            round(float(tiers['200%'][i]), 2),
+            round(float(shabbat[i]) / 60, 2),
+            float(wages[i]),
+            round(float(gross[i]), 2),
+            row.note or '',
+        ]
+
+
+def iter_shift_rows(year, user_id=None, chunk_size=CHUNK_SIZE):
+    # השבוע הראשון של השנה נטען מתחילתו כדי שהמונה השבועי יהיה נכון; השורות שלפני השנה לא נכתבות
+    first_day = date(year, 1, 1)
+    query = db.session.query(
+        Shift.user_id, Shift.date, Shift.start_time, Shift.end_time, Shift.note,
+        User.username, User.hourly_wage, User.city, User.work_days_per_week
+    ).join(User, Shift.user_id == User.id).filter(
+        Shift.date >= week_start(first_day),
+        Shift.date < date(year + 1, 1, 1)
+    )
+    if user_id is not None:
+        query = query.filter(Shift.user_id == user_id)
+    query = query.order_by(Shift.user_id, Shift.date, Shift.start_time, Shift.id)
+
+    # yield_per מפעיל cursor בצד השרת (ב-Postgres) - השורות מגיעות במנות ולא כולן בבת אחת
+    # מונה השעות הנוספות ממשיך ממנה למנה
+    overtime = OvertimeStream()
+    chunk = []
+    for row in query.execution_options(yield_per=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield from _shift_chunk_rows(chunk, overtime, first_day)
+            chunk = []
+    if chunk:
+        yield from _shift_chunk_rows(chunk, overtime, first_day)
+
+
+def iter_payslip_rows(year, user_id=None, chunk_size=CHUNK_SIZE):
+    fill_missing_summaries(None if user_id is None else [user_id], f'{year:04d}-01', f'{year:04d}-12')
+    query = db.session.query(
+        User.username, MonthlySummary.month, MonthlySummary.shift_count,
+        MonthlySummary.total_hours_100, MonthlySummary.total_hours_125,
+        MonthlySummary.total_hours_150, MonthlySummary.total_hours_200,
+        MonthlySummary.gross_salary, MonthlySummary.tax_deductions, MonthlySummary.net_salary
+    ).join(User, MonthlySummary.user_id == User.id).filter(
+        MonthlySummary.month >= f'{year:04d}-01',
+        MonthlySummary.month <= f'{year:04d}-12'
+    )
+    if user_id is not None:
+        query = query.filter(MonthlySummary.user_id == user_id)
+    query = query.order_by(MonthlySummary.user_id, MonthlySummary.month)
+
+    for row in query.execution_options(yield_per=chunk_size):
+        deductions = row.tax_deductions or {}
+        yield [
+            row.username,
+            row.month,
+            row.shift_count,
+            round(row.total_hours_100 or 0.0, 2),
+            round(row.total_hours_125 or 0.0, 2),
+            round(row.total_hours_150 or 0.0, 2),
+            round(row.total_hours_200 or 0.0, 2),
+            row.gross_salary,
+            deductions.get('income_tax', ''),
+            deductions.get('national_insurance', ''),
+            row.net_salary if row.net_salary is not None else '',
+        ]
+
+
+def stream_csv(header, rows, rows_per_chunk=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM כדי ש-Excel יזהה את העברית
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# לקובץ (פקודת ה-CLI): openpyxl במצב write_only כותב כל שורה לקובץ זמני בדיסק - הזיכרון נשאר קבוע
+def write_xlsx(header, rows, path, title):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+# ה-XML של הגיליון נכתב ישירות לתוך רשומת ZIP דחוסה (zipfile יודע לכתוב גם לזרם שאי אפשר לחזור בו,
+# עם data descriptor אחרי כל קובץ), וכל מה שהדחיסה פלטה נשלח מיד - הבייט הראשון יוצא אחרי המנה הראשונה
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+# תווי בקרה שאסורים ב-XML (כמו ש-openpyxl דוחה אותם)
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Chunks:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, np.integer, np.floating)):
+        text = xml_escape(_ILLEGAL_XML.sub('', str(value)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+    return f'<c><v>{value}</v></c>'
+
+
+def _xlsx_row(row):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>'
+
+
+def stream_xlsx(header, rows, title, rows_per_chunk=CHUNK_SIZE):
+    out = _Chunks()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK.format(title=xml_escape(title[:31], {'"': '&quot;'})))
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_xlsx_row(header).encode())
+            for i, row in enumerate(rows, 1):
+                sheet.write(_xlsx_row(row).encode())
+                if i % rows_per_chunk == 0:
+                    yield out.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield out.take()
+
+
+EXPORTS = {
+    'shifts': (SHIFT_HEADER, iter_shift_rows),
+    'payslips': (PAYSLIP_HEADER, iter_payslip_rows),
+}
+
+
+@export_cli.command('run')
+@click.argument('kind', type=click.Choice(sorted(EXPORTS)))
+@click.option('--year', type=int, required=True)
+@click.option('--user-id', type=int, default=None, help='ברירת מחדל: כל המשתמשים')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'xlsx']), default='csv', show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), required=True)
+def run_export(kind, year, user_id, file_format, output):
+    """ייצוא שנתי של משמרות או תלושים לקובץ."""
+    header, iter_rows = EXPORTS[kind]
+    rows = iter_rows(year, user_id)
+    if file_format == 'xlsx':
+        write_xlsx(header, rows, output, f'{kind} {year}')
+    else:
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            for block in stream_csv(header, rows):
+                f.write(block)
+    click.echo(f'✅ הקובץ נשמר: {output}')
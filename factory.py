@@ -0,0 +1,59 @@
+# factory.py
+# בניית האפליקציה בלי תופעות לוואי בזמן ייבוא. create_script_app - הגדרות ומסד נתונים בלבד, בשביל
+# סקריפטים (import_tax_cities.py, import_settlements.py) ותהליכי העובדים של payroll run שצריכים רק
+# app_context. אפליקציית הרשת המלאה נבנית ב-create_app שב-app.py על גבי זו
+import os
+from dotenv import load_dotenv
+from flask import Flask
+from models import db
+
+
+def configure(app):
+    app.secret_key = os.getenv('SECRET_KEY')
+
+    # אתחול Flask-SQLAlchemy
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('POSTGRES_URL')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # מאגר החיבורים: כל תהליך מחזיק עד DB_POOL_SIZE + DB_MAX_OVERFLOW חיבורים פתוחים,
+    # חיבור מת מתגלה לפני שימוש (pre_ping) וחיבור ישן ממוחזר אחרי DB_POOL_RECYCLE שניות
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_pre_ping': True}
+    if not (app.config['SQLALCHEMY_DATABASE_URI'] or '').startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(
+            pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', 30)),
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        )
+
+    # מטמון המשתמש המחובר: תוקף קצר, מספר רשומות מוגבל, ו-Redis משותף אם הוגדר USER_CACHE_URL
+    app.config['USER_CACHE_URL'] = os.getenv('USER_CACHE_URL')
+    app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 60))
+    app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', 1024))
+
+    # מטמון קטעי ה-HTML (טבלת המשמרות, פרטי משמרת). ברירת המחדל ל-Redis היא זה של מטמון המשתמש
+    app.config['FRAGMENT_CACHE_URL'] = os.getenv('FRAGMENT_CACHE_URL', app.config['USER_CACHE_URL'])
+    app.config['FRAGMENT_CACHE_TTL'] = int(os.getenv('FRAGMENT_CACHE_TTL', 60))
+    app.config['FRAGMENT_CACHE_SIZE'] = int(os.getenv('FRAGMENT_CACHE_SIZE', 1024))
+
+    # מדיניות הסיסמאות: שיטת הגיבוב (בפורמט של werkzeug), אורך המלח, מספר התהליכונים לאימות
+    # וכמה גיבובים נוספים יכולים לחכות להם בתור לפני שמחזירים 503
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    app.config['PASSWORD_SALT_LENGTH'] = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', 0))
+
+    # מדידת ביצועים לכל בקשה - רק כשמופעל במפורש (PROFILING=1)
+    app.config['PROFILING'] = os.getenv('PROFILING') == '1'
+    app.config['PROFILING_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('PROFILING_N_PLUS_ONE_THRESHOLD', 20))
+    # /metrics נגיש רק עם "Authorization: Bearer <METRICS_TOKEN>"
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+
+
+def create_script_app():
+    # Load environment variables from .env file
+    load_dotenv()
+    # השם 'app' - אותה תיקיית instance (קבצי החותמת של המטמונים) כמו אפליקציית הרשת
+    app = Flask('app', root_path=os.path.dirname(os.path.abspath(__file__)))
+    configure(app)
+    db.init_app(app)
+    return app
@@ -0,0 +1,26 @@
+# fragment_cache.py
+# מטמון לקטעי HTML מרונדרים: טבלת המשמרות של חודש ופרטי משמרת. המפתח כולל את users.data_version,
+# שעולה בתוך הטרנזקציה של כל שינוי (הוספה/מחיקה של משמרת, עדכון פרטים אישיים - ראו bump_data_version).
+# הגרסה נשמרת במסד ולא במטמון, כך שמיד אחרי ה-commit כל תהליכי העבודה מרנדרים מחדש, גם בלי Redis;
+# הקטעים הישנים לא נקראים יותר ומתפנים מה-LRU מעצמם
+from cache import ConfiguredCache
+
+_get_cache = ConfiguredCache('FRAGMENT_CACHE', 'fragment:')
+
+
+# user - המשתמש המחובר, עם הגרסה שנטענה בתחילת הבקשה (load_user).
+# render מחזיר ערך שאפשר לשמור (מחרוזת HTML או tuple פשוט); None - לא נשמר
+def cached_fragment(user, key, render):
+    cache = _get_cache()
+    full_key = f'{user.id}:{user.data_version}:{key}'
+    value = cache.get(full_key)
+    if value is None:
+        value = render()
+        if value is not None:
+            cache.set(full_key, value)
+    return value
+
+
+# לבנצ'מרקים: מדידה של רינדור קר
+def clear():
+    _get_cache.clear()
@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# הגדרות שרת הייצור. כל עובד מריץ WEB_THREADS בקשות במקביל, ולכן המאגר של כל תהליך
+# צריך להספיק לפחות ל-WEB_THREADS חיבורים (DB_POOL_SIZE + DB_MAX_OVERFLOW ב-app.py).
+# סך החיבורים ל-Postgres: WEB_WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) - לוודא שזה מתחת ל-max_connections
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 4))
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+keepalive = 5
+
+# מחזור עובדים מדי פעם מונע דליפות זיכרון איטיות
+max_requests = 2000
+max_requests_jitter = 200
+
+# ACCESS_LOG= (ריק) מכבה את יומן הגישה
+accesslog = os.getenv('ACCESS_LOG', '-') or None
@@ -0,0 +1,70 @@
+import time
+from sqlalchemy import bindparam, delete, insert, update
+from factory import create_script_app
+from models import db, User, TaxExemptCity, Settlement, SettlementAlias
+from settlements import SETTLEMENTS_FILE, read_settlements, build_aliases, normalize_city_name, \
+    invalidate_settlement_index
+
+BATCH_SIZE = 1000
+
+
+# נתוני ייחוס - מוחלפים במלואם בטרנזקציה אחת
+def replace_settlements(settlements, aliases):
+    db.session.execute(delete(SettlementAlias.__table__))
+    db.session.execute(delete(Settlement.__table__))
+    db.session.execute(insert(Settlement.__table__), settlements)
+    db.session.execute(insert(SettlementAlias.__table__), [
+        {"alias": alias, "settlement_code": code} for alias, code in aliases.items()
+    ])
+
+
+# עדכון settlement_code לכל שורה שהסמל שלה השתנה; מחזיר (קושרו, לא זוהו)
+def _link(table, name_column, aliases, keep_existing):
+    changed = []
+    linked = 0
+    unresolved = []
+    rows = db.session.execute(
+        table.select().with_only_columns(table.c.id, name_column, table.c.settlement_code)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    for row in rows:
+        code = aliases.get(normalize_city_name(row[1])) if row[1] else None
+        if keep_existing and row.settlement_code is not None:
+            code = row.settlement_code
+        if code is not None:
+            linked += 1
+        elif row[1]:
+            unresolved.append(row[1])
+        if code != row.settlement_code:
+            changed.append({"b_id": row.id, "b_code": code})
+
+    for i in range(0, len(changed), BATCH_SIZE):
+        db.session.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(settlement_code=bindparam("b_code")),
+            changed[i:i + BATCH_SIZE],
+        )
+    return linked, unresolved
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    settlements = read_settlements(SETTLEMENTS_FILE)
+    aliases = build_aliases(settlements)
+    read_seconds = time.perf_counter() - started
+
+    with create_script_app().app_context():
+        started = time.perf_counter()
+        replace_settlements(settlements, aliases)
+        # לערים הפטורות יש סמל מקובץ ההודעה (import_tax_cities.py) - משלימים לפי שם רק כשחסר
+        cities_table = TaxExemptCity.__table__
+        cities_linked, cities_unresolved = _link(cities_table, cities_table.c.city_name, aliases, True)
+        users_table = User.__table__
+        users_linked, users_unresolved = _link(users_table, users_table.c.city, aliases, False)
+        db.session.commit()
+        invalidate_settlement_index()
+        write_seconds = time.perf_counter() - started
+
+    print(f"✅ נשמרו {len(settlements)} יישובים ו-{len(aliases)} שמות מנורמלים.")
+    print(f"יישובים מזכים שקושרו: {cities_linked} | ללא התאמה: {len(cities_unresolved)} {cities_unresolved[:10]}")
+    print(f"משתמשים שקושרו: {users_linked} | ללא התאמה: {len(users_unresolved)}")
+    print(f"זמן קריאת הקובץ: {read_seconds:.2f} שניות | זמן עדכון המסד: {write_seconds:.2f} שניות")
@@ -1,33 +1,138 @@
-import pandas as pd
-from app import app, db  # מייבא את האפליקציה ואת מסד הנתונים שלך
-from models import TaxExemptCity  # מייבא את המודל של הטבלה החדשה
+import time
+from sqlalchemy import bindparam, insert, or_, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from factory import create_script_app  # אפליקציה רזה - רק הגדרות ומסד נתונים
+from models import db, TaxExemptCity  # מייבא את המודל של הטבלה החדשה
+from cities import invalidate_city_cache
 
+file_path = "public_announcment_pa110124.xlsx"
+BATCH_SIZE = 500
 
+cities_table = TaxExemptCity.__table__
 
-# קריאה לקובץ ה-Excel
-file_path = "public_announcment_pa110124.xlsx"
-df = pd.read_excel(file_path, skiprows=2)
-
-
-
-# שינוי שמות העמודות והתאמה לפורמט שלך
-df.columns = ['city_code', 'city_name', 'score', 'tax_discount_percent', 'annual_cap']
-df = df[['city_name', 'tax_discount_percent', 'annual_cap']]
-df = df.dropna(subset=["city_name"])
-df["tax_discount_percent"] = df["tax_discount_percent"].astype(float)
-df["annual_cap"] = df["annual_cap"].astype(float)
-
-# הכנסת הנתונים למסד הנתונים
-with app.app_context():
-    for _, row in df.iterrows():
-        city_name = row["city_name"].strip()
-        if not TaxExemptCity.query.filter_by(city_name=city_name).first():
-            city = TaxExemptCity(
-                city_name=city_name,
-                tax_discount_percent=row["tax_discount_percent"],
-                annual_cap=row["annual_cap"]
-            )
-            db.session.add(city)
-    db.session.commit()
-
-print("✅ הנתונים נשמרו בהצלחה בטבלה tax_exempt_cities.")
+
+def read_cities(path):
+    # pandas נטען רק כשבאמת קוראים את הקובץ (ובשביל upsert_cities לא צריך אותו)
+    import pandas as pd
+
+    # קריאה לקובץ ה-Excel
+    df = pd.read_excel(path, skiprows=2)
+
+    # שינוי שמות העמודות והתאמה לפורמט שלך
+    df.columns = ['city_code', 'city_name', 'score', 'tax_discount_percent', 'annual_cap']
+    df = df[['city_code', 'city_name', 'tax_discount_percent', 'annual_cap']]
+    df = df.dropna(subset=["city_name"])
+    # סמל היישוב בהודעה הוא סמל הלמ"ס - אותו מפתח כמו ב-all_cities.csv (import_settlements.py)
+    df["settlement_code"] = pd.to_numeric(df.pop("city_code"), errors="coerce").astype("Int64")
+    df["city_name"] = df["city_name"].astype(str).str.strip()
+    df["tax_discount_percent"] = df["tax_discount_percent"].astype(float)
+    df["annual_cap"] = df["annual_cap"].astype(float)
+    # יישוב שמופיע פעמיים - השורה האחרונה קובעת
+    df = df.drop_duplicates(subset=["city_name"], keep="last")
+    records = df.to_dict("records")
+    for record in records:
+        record["settlement_code"] = None if pd.isna(record["settlement_code"]) else int(record["settlement_code"])
+    return records
+
+
+# Postgres: פקודה אחת לכל אצווה. שורות שלא השתנו לא מתעדכנות ולא חוזרות ב-RETURNING,
+# ו-xmax = 0 מסמן שורה שנוספה (ולא עודכנה)
+def _upsert_batch_postgres(batch):
+    stmt = pg_insert(cities_table).values(batch)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[cities_table.c.city_name],
+        set_={
+            "tax_discount_percent": excluded.tax_discount_percent,
+            "annual_cap": excluded.annual_cap,
+            "settlement_code": excluded.settlement_code,
+        },
+        where=or_(
+            cities_table.c.tax_discount_percent.is_distinct_from(excluded.tax_discount_percent),
+            cities_table.c.annual_cap.is_distinct_from(excluded.annual_cap),
+            cities_table.c.settlement_code.is_distinct_from(excluded.settlement_code),
+        ),
+    ).returning(text("(xmax = 0) AS inserted"))
+
+    rows = db.session.execute(stmt).all()
+    inserted = sum(1 for row in rows if row.inserted)
+    return inserted, len(rows) - inserted
+
+
+# שאר מסדי הנתונים: SELECT אחד לאצווה, ואז הכנסה ועדכון ב-executemany
+def _upsert_batch_generic(batch):
+    names = [row["city_name"] for row in batch]
+    existing = {
+        row.city_name: row
+        for row in db.session.execute(
+            cities_table.select().where(cities_table.c.city_name.in_(names))
+        )
+    }
+
+    new_rows = [row for row in batch if row["city_name"] not in existing]
+    changed_rows = [
+        {
+            "b_city_name": row["city_name"],
+            "b_tax_discount_percent": row["tax_discount_percent"],
+            "b_annual_cap": row["annual_cap"],
+            "b_settlement_code": row["settlement_code"],
+        }
+        for row in batch
+        if row["city_name"] in existing and (
+            existing[row["city_name"]].tax_discount_percent != row["tax_discount_percent"]
+            or existing[row["city_name"]].annual_cap != row["annual_cap"]
+            or existing[row["city_name"]].settlement_code != row["settlement_code"]
+        )
+    ]
+
+    if new_rows:
+        db.session.execute(insert(cities_table), new_rows)
+    if changed_rows:
+        db.session.execute(
+            update(cities_table)
+            .where(cities_table.c.city_name == bindparam("b_city_name"))
+            .values(
+                tax_discount_percent=bindparam("b_tax_discount_percent"),
+                annual_cap=bindparam("b_annual_cap"),
+                settlement_code=bindparam("b_settlement_code"),
+            ),
+            changed_rows,
+        )
+    return len(new_rows), len(changed_rows)
+
+
+def upsert_cities(rows, batch_size=BATCH_SIZE):
+    if db.engine.dialect.name == "postgresql":
+        upsert_batch = _upsert_batch_postgres
+    else:
+        upsert_batch = _upsert_batch_generic
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        inserted, updated = upsert_batch(batch)
+        counts["inserted"] += inserted
+        counts["updated"] += updated
+        counts["unchanged"] += len(batch) - inserted - updated
+    return counts
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    rows = read_cities(file_path)
+    read_seconds = time.perf_counter() - started
+
+    # הכנסת הנתונים למסד הנתונים
+    with create_script_app().app_context():
+        started = time.perf_counter()
+        counts = upsert_cities(rows)
+        db.session.commit()
+        upsert_seconds = time.perf_counter() - started
+
+        if counts["inserted"] or counts["updated"]:
+            # רשימת היישובים השתנתה - המטמון של /api/cities צריך להיטען מחדש
+            invalidate_city_cache()
+
+    print("✅ הנתונים נשמרו בהצלחה בטבלה tax_exempt_cities.")
+    print(f"נוספו: {counts['inserted']} | עודכנו: {counts['updated']} | ללא שינוי: {counts['unchanged']}")
+    print(f"זמן קריאת הקובץ: {read_seconds:.2f} שניות | זמן עדכון המסד: {upsert_seconds:.2f} שניות")
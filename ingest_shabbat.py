@@ -0,0 +1,17 @@
+import sys
+import time
+from shabbat import SHABBAT_FILE, CACHE_DIR, load_indexes, save_cache
+
+# המרת קבצי זמני שבת/חג (קובץ לכל שנה) למטמון בינארי שה-workers טוענים במילישניות
+# שימוש: python ingest_shabbat.py shabat_times_2025.xlsx shabat_times_2026.xlsx ...
+if __name__ == "__main__":
+    paths = sys.argv[1:] or [SHABBAT_FILE]
+
+    started = time.perf_counter()
+    indexes = load_indexes(paths)
+    save_cache(indexes, CACHE_DIR)
+    print(f"✅ המטמון נשמר בתיקייה {CACHE_DIR} ({time.perf_counter() - started:.2f} שניות)")
+
+    for zone, index in indexes.items():
+        print(f"{zone}: {len(index.starts)} חלונות שבת/חג")
+    print("שכר המשמרות השמור מחושב מחדש לפי הלוח החדש: flask payroll backfill-shifts")
@@ -0,0 +1,119 @@
+# instrumentation.py
+# מדידת ביצועים לכל בקשה (אופציונלי, מופעל עם PROFILING=1):
+# היסטוגרמת זמני תגובה לכל endpoint, מספר ומשך פקודות SQL, זמן רינדור תבניות,
+# וסימון בקשות שחורגות מסף שאילתות (חשד ל-N+1)
+import hmac
+import time
+from threading import Lock
+from flask import g, has_request_context, jsonify, request, abort, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# גבולות הדליים של ההיסטוגרמה, במילישניות
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+DEFAULT_N_PLUS_ONE_THRESHOLD = 20
+
+_metrics = {}
+_lock = Lock()
+
+
+def _endpoint_metrics(endpoint):
+    if endpoint not in _metrics:
+        _metrics[endpoint] = {
+            "requests": 0,
+            "latency_ms_sum": 0.0,
+            "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+            "sql_statements": 0,
+            "sql_ms": 0.0,
+            "template_ms": 0.0,
+            "n_plus_one_flags": 0,
+        }
+    return _metrics[endpoint]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "profile" in g:
+        g.profile["sql_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "profile" in g:
+        profile = g.profile
+        profile["sql_statements"] += 1
+        profile["sql_ms"] += (time.perf_counter() - profile.pop("sql_started", time.perf_counter())) * 1000
+
+
+def _before_render(sender, template, context, **extra):
+    if "profile" in g:
+        g.profile["template_started"] = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    if "profile" in g:
+        started = g.profile.pop("template_started", time.perf_counter())
+        g.profile["template_ms"] += (time.perf_counter() - started) * 1000
+
+
+def init_instrumentation(app):
+    threshold = app.config.get("PROFILING_N_PLUS_ONE_THRESHOLD", DEFAULT_N_PLUS_ONE_THRESHOLD)
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_profile():
+        g.profile = {"started": time.perf_counter(), "sql_statements": 0, "sql_ms": 0.0, "template_ms": 0.0}
+
+    @app.after_request
+    def record_profile(response):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+
+        latency_ms = (time.perf_counter() - profile["started"]) * 1000
+        endpoint = request.endpoint or "unknown"
+        bucket = next((i for i, limit in enumerate(LATENCY_BUCKETS) if latency_ms <= limit), len(LATENCY_BUCKETS))
+        suspicious = profile["sql_statements"] > threshold
+
+        with _lock:
+            metrics = _endpoint_metrics(endpoint)
+            metrics["requests"] += 1
+            metrics["latency_ms_sum"] += latency_ms
+            metrics["latency_buckets"][bucket] += 1
+            metrics["sql_statements"] += profile["sql_statements"]
+            metrics["sql_ms"] += profile["sql_ms"]
+            metrics["template_ms"] += profile["template_ms"]
+            metrics["n_plus_one_flags"] += int(suspicious)
+
+        if suspicious:
+            app.logger.warning(
+                "חשד ל-N+1: %s הריץ %d פקודות SQL (סף: %d)",
+                endpoint, profile["sql_statements"], threshold
+            )
+
+        response.headers["X-Query-Count"] = str(profile["sql_statements"])
+        response.headers["Server-Timing"] = (
+            f'app;dur={latency_ms:.1f}, sql;dur={profile["sql_ms"]:.1f}, template;dur={profile["template_ms"]:.1f}'
+        )
+        return response
+
+    # מאחורי ה-reverse proxy כל בקשה מגיעה מ-127.0.0.1, ולכן הגישה לפי אסימון (METRICS_TOKEN) ולא לפי כתובת.
+    # בלי אסימון מוגדר נקודת הקצה לא קיימת
+    token = app.config.get("METRICS_TOKEN")
+
+    @app.route("/metrics")
+    def metrics():
+        given = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not token or not hmac.compare_digest(given.encode(), token.encode()):
+            abort(404)
+        with _lock:
+            snapshot = {
+                endpoint: {**values, "latency_buckets": [
+                    {"le_ms": limit, "count": count}
+                    for limit, count in zip(list(LATENCY_BUCKETS) + [None], values["latency_buckets"])
+                ]}
+                for endpoint, values in _metrics.items()
+            }
+        return jsonify({"n_plus_one_threshold": threshold, "endpoints": snapshot})
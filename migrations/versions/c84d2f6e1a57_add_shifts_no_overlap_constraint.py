@@ -0,0 +1,40 @@
+"""Add shifts_no_overlap exclusion constraint (Postgres only)
+
+Revision ID: c84d2f6e1a57
+Revises: 5b2e07c8d913
+Create Date: 2025-08-12 20:31:14.902187
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c84d2f6e1a57'
+down_revision = '5b2e07c8d913'
+branch_labels = None
+depends_on = None
+
+
+# טווח המשמרת כמו ב-get_shift_duration: סיום לפני התחלה = המשמרת מסתיימת למחרת
+SHIFT_RANGE = (
+    "tsrange(date + start_time, "
+    "CASE WHEN end_time < start_time THEN (date + 1) + end_time ELSE date + end_time END, '[)')"
+)
+
+
+def upgrade():
+    # אילוץ EXCLUDE קיים רק ב-Postgres; בשאר מסדי הנתונים הבדיקה נעשית באפליקציה (shifts.ShiftIntervals)
+    # שימו לב: אם כבר יש משמרות חופפות במסד, יש לנקות אותן לפני הרצת המיגרציה
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # user_id עטוף בטווח של ערך אחד כדי שאינדקס ה-gist יעבוד בלי התוסף btree_gist
+    op.execute(
+        f"ALTER TABLE shifts ADD CONSTRAINT shifts_no_overlap "
+        f"EXCLUDE USING gist (int4range(user_id, user_id, '[]') WITH &&, {SHIFT_RANGE} WITH &&)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('ALTER TABLE shifts DROP CONSTRAINT shifts_no_overlap')
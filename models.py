@@ -16,16 +16,25 @@ class User(UserMixin, db.Model):
     gender = db.Column(db.String(10))  # "זכר"/"נקבה"
     marital_status = db.Column(db.String(10))  # "רווק"/"נשוי"
     city = db.Column(db.String(50))
+    settlement_code = db.Column(db.Integer, index=True)  # סמל היישוב לפי all_cities.csv, נקבע מ-city
     has_degree = db.Column(db.Boolean, default=False)
     degree_year = db.Column(db.Integer, nullable=True)
     hourly_wage = db.Column(db.Float, default=35.0)
     tax_credit_points = db.Column(db.Float, default=2.25)
+    work_days_per_week = db.Column(db.Integer, default=6, server_default='6', nullable=False)  # 5 או 6
     deductions = db.Column(db.JSON, default={})
+    # עולה בכל שינוי בנתוני המשתמש (ראו bump_data_version ב-user_cache.py) - מפתח המטמונים, משותף לכל התהליכים
+    data_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     shifts = db.relationship('Shift', backref='user', lazy=True)
     children = db.relationship('Child', backref='parent', cascade="all, delete-orphan")
+    monthly_summaries = db.relationship('MonthlySummary', backref='user', lazy=True, cascade="all, delete-orphan")
+    tax_year_totals = db.relationship('TaxYearTotal', backref='user', lazy=True, cascade="all, delete-orphan")
 
 class Shift(db.Model):
     __tablename__ = 'shifts'
+    # ב-Postgres יש גם אילוץ EXCLUDE (shifts_no_overlap) שמונע משמרות חופפות - ראו המיגרציה
+    __table_args__ = (db.Index('ix_shifts_user_id_date', 'user_id', 'date'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -33,6 +42,55 @@ class Shift(db.Model):
     end_time = db.Column(db.Time, nullable=False)
     note = db.Column(db.Text)
 
+    # ערכים מחושבים (ראו refresh_shift_pay ב-shifts.py). pay_version ריק או ישן - השורה טרם חושבה
+    # מחדש והקוראים מחשבים אותה בזמן ריצה
+    pay_version = db.Column(db.SmallInteger)
+    duration_minutes = db.Column(db.Integer)
+    minutes_100 = db.Column(db.Integer)
+    minutes_125 = db.Column(db.Integer)
+    minutes_150 = db.Column(db.Integer)
+    minutes_200 = db.Column(db.Integer)
+    shabbat_minutes = db.Column(db.Integer)
+    # גרסת לוח השבתות שלפיו חושבו shabbat_minutes (ראו calendar_version ב-shabbat.py)
+    shabbat_version = db.Column(db.String(16))
+    pay_rate = db.Column(db.Float)
+    gross_pay = db.Column(db.Float)
+
+class MonthlySummary(db.Model):
+    __tablename__ = 'monthly_summaries'
+    __table_args__ = (db.UniqueConstraint('user_id', 'month', name='uq_monthly_summaries_user_month'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # למשל "2025-07"
+    shift_count = db.Column(db.Integer, nullable=False, default=0)
+    total_hours_100 = db.Column(db.Float, nullable=False, default=0.0)
+    total_hours_125 = db.Column(db.Float, nullable=False, default=0.0)
+    total_hours_150 = db.Column(db.Float, nullable=False, default=0.0)
+    total_hours_200 = db.Column(db.Float, nullable=False, default=0.0)
+    gross_salary = db.Column(db.Float, nullable=False, default=0.0)
+    net_salary = db.Column(db.Float)
+    tax_deductions = db.Column(db.JSON, default={})
+
+# מצטבר שנתי לחישוב המס (ראו tax_year.py): סכומי החודשים 1..through_month של שנת המס
+class TaxYearTotal(db.Model):
+    __tablename__ = 'tax_year_totals'
+    __table_args__ = (db.UniqueConstraint('user_id', 'tax_year', name='uq_tax_year_totals_user_year'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    tax_year = db.Column(db.Integer, nullable=False)
+    through_month = db.Column(db.Integer, nullable=False, default=0)  # 0 - עוד לא נצבר אף חודש
+    gross = db.Column(db.Float, nullable=False, default=0.0)
+    income_tax = db.Column(db.Float, nullable=False, default=0.0)
+    credit_points = db.Column(db.Float, nullable=False, default=0.0)
+    credit = db.Column(db.Float, nullable=False, default=0.0)
+    city_income = db.Column(db.Float, nullable=False, default=0.0)  # הכנסה שכבר נוצלה מתקרת היישוב המזכה
+    city_discount = db.Column(db.Float, nullable=False, default=0.0)
+    # מספר חודש (כמחרוזת) -> הסכומים המצטברים בסופו, לכל חודש שנצבר עם משמרות. מאפשר לחזור לחודש
+    # קודם בלי לבנות מחדש; ריק (NULL) בשורות ישנות, שנבנות מחדש פעם אחת
+    snapshots = db.Column(db.JSON)
+
 class Child(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     birth_date = db.Column(db.Date)
@@ -46,4 +104,25 @@ class TaxExemptCity(db.Model):
     city_name = db.Column(db.String(100), unique=True, nullable=False)
     tax_discount_percent = db.Column(db.Float, default=0.0)
     annual_cap = db.Column(db.Float, default=0.0)
+    settlement_code = db.Column(db.Integer, index=True)
+
+
+# יישובים מ-all_cities.csv (הלמ"ס) - מפתח יציב לקישור בין User.city לבין tax_exempt_cities.
+# הקישור הוא לפי סמל יישוב ללא מפתח זר, כך שסדר הייבוא של שני הקבצים לא משנה
+class Settlement(db.Model):
+    __tablename__ = 'settlements'
+
+    code = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    name_en = db.Column(db.String(100))
+    district = db.Column(db.String(50))
+    aliases = db.relationship('SettlementAlias', backref='settlement', cascade="all, delete-orphan")
+
+
+# שמות מנורמלים (ראו normalize_city_name) - השם הרשמי וגרסאות נוספות שמובילות לאותו יישוב
+class SettlementAlias(db.Model):
+    __tablename__ = 'settlement_aliases'
+
+    alias = db.Column(db.String(100), primary_key=True)
+    settlement_code = db.Column(db.Integer, db.ForeignKey('settlements.code'), nullable=False)
 
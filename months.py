@@ -0,0 +1,21 @@
+# months.py
+# עזרי חודשים - חודש מיוצג כמחרוזת "YYYY-MM" כמו בטבלת monthly_summaries
+from datetime import date
+
+
+def month_key(day):
+    return day.strftime('%Y-%m')
+
+
+# טווח התאריכים של חודש: [היום הראשון בחודש, היום הראשון בחודש הבא)
+def month_bounds(month):
+    year, mon = map(int, month.split('-'))
+    start = date(year, mon, 1)
+    end = date(year + 1, 1, 1) if mon == 12 else date(year, mon + 1, 1)
+    return start, end
+
+
+def add_months(month, delta):
+    year, mon = map(int, month.split('-'))
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
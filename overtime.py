@@ -0,0 +1,91 @@
+# overtime.py
+# צבירת שעות נוספות שבועית: מעבר אחד על המשמרות בסדר כרונולוגי עם מונים רצים של היום והשבוע.
+# שעה היא רגילה רק אם לא עברה את מכסת היום ואת מכסת השבוע. שעה נוספת מדורגת לפי המקום שלה ביום:
+# עד שעתיים אחרי המכסה היומית 125%, שעתיים נוספות 150%, והשאר 200% (TIERS). שעה נוספת בגלל
+# מכסת השבוע שנופלת בתוך המכסה היומית היא ב-125% - אחרת יום של 8 שעות בשבוע שכבר מלא היה מגיע ל-200%
+from datetime import timedelta
+import numpy as np
+from payroll import TIERS, round_pay
+
+WEEKLY_REGULAR_HOURS = 42
+# מכסת שעות רגילות ליום לפי שבוע עבודה של 5 או 6 ימים (בפישוט)
+DAILY_REGULAR_HOURS = {5: 8.6, 6: 8.0}
+DEFAULT_WORK_DAYS = 6
+
+TIER_NAMES = tuple(name for name, _, _, _ in TIERS)
+# גבולות השעות הנוספות בתוך היום, יחסית לסוף המכסה היומית: 125% עד 2, 150% עד 4, ואחר כך 200%
+OVERTIME_LIMITS = tuple(
+    (None if high is None else high - TIERS[0][2]) for _, _, high, _ in TIERS[1:]
+)
+
+
+# השבוע מתחיל ביום ראשון
+def week_start(day):
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+class WeeklyOvertime:
+    def __init__(self, work_days=DEFAULT_WORK_DAYS):
+        self.daily_regular = DAILY_REGULAR_HOURS.get(work_days, DAILY_REGULAR_HOURS[DEFAULT_WORK_DAYS])
+        self.week = None
+        self.day = None
+        self.week_regular = 0.0
+        self.day_hours = 0.0
+
+    # מחזיר את פירוק שעות המשמרת לפי המדרגות, בסדר של TIERS
+    def add(self, shift_date, hours):
+        week = week_start(shift_date)
+        if week != self.week:
+            self.week = week
+            self.week_regular = 0.0
+        if shift_date != self.day:
+            self.day = shift_date
+            self.day_hours = 0.0
+
+        regular = min(hours, max(self.daily_regular - self.day_hours, 0.0),
+                      max(WEEKLY_REGULAR_HOURS - self.week_regular, 0.0))
+        # השעות הנוספות הן סוף המשמרת: [start, end) במונחי שעות העבודה של היום
+        start = self.day_hours + regular
+        end = self.day_hours + hours
+        self.day_hours += hours
+        self.week_regular += regular
+
+        breakdown = [regular]
+        lower = 0.0
+        for limit in OVERTIME_LIMITS:
+            upper = np.inf if limit is None else self.daily_regular + limit
+            breakdown.append(max(min(end, upper) - max(start, lower), 0.0))
+            lower = upper
+        return breakdown
+
+
+# פירוק לכל משמרת בקבוצה. השורות חייבות להיות ממוינות לפי (בעלים, תאריך, שעת התחלה);
+# מונה חדש נפתח בכל החלפת בעלים, כך שכל החודש או השנה מחושבים בזמן לינארי.
+# המונה האחרון נשמר בין קריאות - אפשר להזין את אותו זרם במנות (כמו בייצוא)
+class OvertimeStream:
+    def __init__(self):
+        self.owner = None
+        self.accumulator = None
+
+    def tiers(self, owners, dates, hours, work_days):
+        hours = np.asarray(hours, dtype=float)
+        result = np.zeros((len(hours), len(TIERS)))
+        for i, owner in enumerate(owners):
+            if self.accumulator is None or owner != self.owner:
+                self.accumulator = WeeklyOvertime(work_days[i])
+                self.owner = owner
+            result[i] = self.accumulator.add(dates[i], float(hours[i]))
+        return {name: result[:, k] for k, name in enumerate(TIER_NAMES)}
+
+    def pay(self, owners, dates, hours, hourly_rates, work_days):
+        tiers = self.tiers(owners, dates, hours, work_days)
+        rates = np.broadcast_to(np.asarray(hourly_rates, dtype=float), np.shape(hours))
+        pay = np.zeros(rates.shape)
+        # אותו סדר פעולות כמו ב-calculate_pay_batch, כך שמשמרת בודדת יוצאת זהה
+        for name, _, _, multiplier in TIERS:
+            pay = pay + tiers[name] * rates * multiplier
+        return round_pay(pay), tiers
+
+
+def weekly_pay_batch(owners, dates, hours, hourly_rates, work_days):
+    return OvertimeStream().pay(owners, dates, hours, hourly_rates, work_days)
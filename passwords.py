@@ -0,0 +1,85 @@
+# passwords.py
+# מדיניות גיבוב סיסמאות: השיטה נקבעת בהגדרות (ברירת מחדל scrypt - דורש זיכרון ולא רק מעבד),
+# גיבוב ישן משודרג בשקט בהתחברות מוצלחת, והאימות רץ במאגר תהליכונים מוגבל -
+# בזמן גל התחברויות רק מספר קבוע של גיבובים רצים או ממתינים, ובקשה שאין לה מקום מקבלת מיד "עמוס" (503)
+# במקום לחכות
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from threading import BoundedSemaphore, Lock
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+DEFAULT_SALT_LENGTH = 16
+DEFAULT_WORKERS = 2
+# כמה גיבובים יכולים לחכות בתור של המאגר מעבר לאלה שרצים, לפני שמחזירים "עמוס" (0 - רק כמספר התהליכונים)
+DEFAULT_QUEUE = 0
+
+
+class PasswordBusy(Exception):
+    pass
+
+
+_pool = None
+_slots = None
+_normalized = {}
+_lock = Lock()
+
+
+def _config():
+    config = current_app.config
+    return (config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+            config.get('PASSWORD_SALT_LENGTH', DEFAULT_SALT_LENGTH),
+            config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+            config.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE),
+            config.get('PASSWORD_HASH_TIMEOUT', 10))
+
+
+def _get_pool(workers, queue):
+    global _pool, _slots
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _slots = BoundedSemaphore(workers + queue)
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+    return _pool
+
+
+# המקום משתחרר רק כשהגיבוב עצמו הסתיים (done callback), גם אם הבקשה כבר ויתרה עליו -
+# כך מספר הגיבובים שרצים או ממתינים במאגר לא עולה אף פעם על workers + queue
+def _run(fn, *args):
+    method, salt_length, workers, queue, timeout = _config()
+    pool = _get_pool(workers, queue)
+    if not _slots.acquire(blocking=False):
+        raise PasswordBusy()
+    try:
+        future = pool.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        raise PasswordBusy()
+
+
+def hash_password(password):
+    method, salt_length, _, _, _ = _config()
+    return _run(generate_password_hash, password, method, salt_length)
+
+
+def verify_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+# werkzeug שומר את השיטה המלאה (כולל פרמטרים) בתחילת הגיבוב: method$salt$hash
+def _normalized_method(method):
+    if method not in _normalized:
+        _normalized[method] = generate_password_hash('', method, 1).split('$', 1)[0]
+    return _normalized[method]
+
+
+def needs_rehash(pwhash):
+    method, salt_length, _, _, _ = _config()
+    parts = pwhash.split('$')
+    return len(parts) != 3 or parts[0] != _normalized_method(method) or len(parts[1]) != salt_length
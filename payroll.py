@@ -0,0 +1,98 @@
+# payroll.py
+# מנוע חישוב שכר וקטורי - מחשב משמרות רבות בקריאה אחת על מערכי NumPy
+from datetime import date, datetime, timedelta
+import numpy as np
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+# מדרגות שעות נוספות לפי החוק: (שם המדרגה, שעת התחלה, שעת סיום, מכפיל)
+TIERS = (
+    ("100%", 0, 8, 1.0),
+    ("125%", 8, 10, 1.25),
+    ("150%", 10, 12, 1.5),
+    ("200%", 12, None, 2),
+)
+
+# תוספת עבודה בשבת/חג: 150% במקום 100%, כלומר 50% מעל התשלום לפי המדרגות
+SHABBAT_PREMIUM = 0.5
+
+
+def calculate_pay_batch(hours, hourly_rates):
+    # hours ו-hourly_rates הם מערכים באותו אורך (או סקלר שמשודר על כל המערך)
+    hours = np.asarray(hours, dtype=float)
+    rates = np.broadcast_to(np.asarray(hourly_rates, dtype=float), hours.shape)
+
+    tiers = {}
+    for name, low, high, _ in TIERS:
+        upper = np.inf if high is None else high - low
+        tiers[name] = np.clip(hours - low, 0.0, upper)
+
+    # כל ענף מחושב באותו סדר פעולות כמו בחישוב הסקלרי, כדי שהתוצאה תהיה זהה עד הביט
+    pay = np.select(
+        [hours <= 8, hours <= 10, hours <= 12],
+        [
+            hours * rates,
+            8 * rates + (hours - 8) * rates * 1.25,
+            8 * rates + 2 * rates * 1.25 + (hours - 10) * rates * 1.5,
+        ],
+        default=(
+            8 * rates +
+            2 * rates * 1.25 +
+            2 * rates * 1.5 +
+            (hours - 12) * rates * 2
+        ),
+    )
+
+    return round_pay(pay), tiers
+
+
+def shabbat_premium_batch(shabbat_minutes, hourly_rates):
+    hours = np.asarray(shabbat_minutes, dtype=float) / 60
+    return round_pay(hours * np.asarray(hourly_rates, dtype=float) * SHABBAT_PREMIUM)
+
+
+def round_pay(pay):
+    # עיגול לאגורות בדיוק כמו round() של פייתון (np.round עלול לסטות במקרי קצה)
+    pay = np.asarray(pay, dtype=float)
+    return np.fromiter((round(p, 2) for p in pay.ravel().tolist()), dtype=float, count=pay.size).reshape(pay.shape)
+
+
+# משך משמרת בדקות - אותו חישוב כמו get_shift_duration (משמרת שחוצה חצות מסתיימת למחרת)
+def shift_minutes(shift):
+    if not shift.start_time or not shift.end_time or not shift.date:
+        return 0
+
+    start_dt = datetime.combine(shift.date, shift.start_time)
+    end_dt = datetime.combine(shift.date, shift.end_time)
+    if end_dt < start_dt:
+        end_dt += timedelta(days=1)
+
+    return int(abs(end_dt - start_dt).total_seconds() // 60)
+
+
+# המרת דקות לשעות עשרוניות כמו ב-shift_details (שעות שלמות + דקות/60)
+def minutes_to_hours(total_minutes):
+    total_minutes = np.asarray(total_minutes)
+    return total_minutes // 60 + (total_minutes % 60) / 60
+
+
+def _seconds_of_day(times):
+    return np.fromiter((t.hour * 3600 + t.minute * 60 + t.second for t in times), dtype=np.int64)
+
+
+# גרסה וקטורית של shift_minutes על עמודות של שעות התחלה וסיום
+def shift_minutes_batch(start_times, end_times):
+    seconds = (_seconds_of_day(end_times) - _seconds_of_day(start_times)) % 86400
+    return seconds // 60
+
+
+# תחילת המשמרות בדקות מאז 1970 (כמו באינדקס השבת)
+def shift_start_minutes_batch(dates, start_times):
+    days = np.fromiter((d.toordinal() for d in dates), dtype=np.int64) - EPOCH_ORDINAL
+    return days * 1440 + _seconds_of_day(start_times) // 60
+
+
+def format_duration(total_minutes):
+    return f"{int(total_minutes // 60):02d}:{int(total_minutes % 60):02d}"
+
@@ -0,0 +1,179 @@
+# payroll_run.py
+# הרצת שכר חודשית לכל המשתמשים: flask payroll run 2025-07 --workers 8
+# המשתמשים מחולקים לרסיסים לפי טווחי מזהים, כל רסיס מחושב בתהליך נפרד עם מנוע SQLAlchemy משלו,
+# ורסיס שהסתיים נרשם בקובץ התקדמות - הרצה חוזרת אחרי קריסה מדלגת עליו
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, User, Shift, MonthlySummary
+from shifts import refresh_shift_pay, stale_pay_filter
+from summaries import store_payslip
+from tax_year import payslips_for_month, rebuild, year_to_date
+
+payroll_cli = AppGroup('payroll', help='חישובי שכר מרוכזים')
+
+DEFAULT_SHARD_SIZE = 1000
+
+
+def run_shard(month, low, high):
+    user_ids = [row[0] for row in db.session.query(User.id).filter(User.id >= low, User.id < high)]
+    if not user_ids:
+        return low, high, 0, 0.0
+
+    payslips = payslips_for_month(user_ids, month)
+    summaries = {
+        summary.user_id: summary
+        for summary in MonthlySummary.query.filter(
+            MonthlySummary.user_id.in_(user_ids),
+            MonthlySummary.month == month
+        )
+    }
+    for payslip in payslips:
+        store_payslip(payslip, summaries.get(payslip["user_id"]))
+    db.session.commit()
+    return low, high, len(payslips), sum(payslip["gross"] for payslip in payslips)
+
+
+_worker_app = None
+
+
+# נקודת הכניסה בתהליך העובד - אפליקציה רזה (הגדרות ומסד בלבד) לכל תהליך, עם מנוע וחיבורים נפרדים
+def _worker_run_shard(month, low, high):
+    global _worker_app
+    if _worker_app is None:
+        from factory import create_script_app
+        _worker_app = create_script_app()
+    with _worker_app.app_context():
+        return run_shard(month, low, high)
+
+
+def _checkpoint_path(month):
+    return os.path.join(current_app.instance_path, 'payroll_runs', f'{month}.done')
+
+
+# הטווחים [low, high) שהושלמו, ממוזגים וממוינים
+def _load_checkpoint(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        ranges = sorted(tuple(map(int, line.split()[:2])) for line in f if line.strip())
+    merged = []
+    for low, high in ranges:
+        if merged and low <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], high)
+        else:
+            merged.append([low, high])
+    return merged
+
+
+# רסיס מדלגים עליו רק אם כולו בתוך טווח שהושלם - הרצה חוזרת עם --shard-size אחר לא מפספסת משתמשים
+def _covered(done, low, high):
+    return any(start <= low and high <= end for start, end in done)
+
+
+@payroll_cli.command('run')
+@click.argument('month')
+@click.option('--workers', default=os.cpu_count(), show_default=True, help='מספר תהליכים')
+@click.option('--shard-size', default=DEFAULT_SHARD_SIZE, show_default=True, help='טווח מזהי משתמשים לכל רסיס')
+@click.option('--restart', is_flag=True, help='התעלמות מקובץ ההתקדמות והרצה מחדש של כל הרסיסים')
+def run_payroll(month, workers, shard_size, restart):
+    """חישוב תלושי שכר לכל המשתמשים עבור חודש (YYYY-MM)."""
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        raise click.BadParameter('פורמט החודש צריך להיות YYYY-MM', param_hint='MONTH')
+
+    bounds = db.session.query(db.func.min(User.id), db.func.max(User.id)).one()
+    if bounds[0] is None:
+        click.echo('אין משתמשים')
+        return
+
+    path = _checkpoint_path(month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if restart and os.path.exists(path):
+        os.remove(path)
+    done = _load_checkpoint(path)
+
+    lows = range(bounds[0], bounds[1] + 1, shard_size)
+    shards = [(low, low + shard_size) for low in lows if not _covered(done, low, low + shard_size)]
+    click.echo(f'{len(shards)} רסיסים לחישוב ({len(lows) - len(shards)} כבר הושלמו)')
+    db.session.remove()
+
+    started = time.perf_counter()
+    users = 0
+    with open(path, 'a') as checkpoint:
+        def record(result):
+            nonlocal users
+            low, high, count, gross = result
+            users += count
+            checkpoint.write(f'{low} {high} {count} {gross:.2f}\n')
+            checkpoint.flush()
+            click.echo(f'  [{low}, {high}): {count} משתמשים, ברוטו {gross:,.2f} ₪')
+
+        if workers <= 1:
+            for low, high in shards:
+                record(run_shard(month, low, high))
+        else:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = [pool.submit(_worker_run_shard, month, low, high) for low, high in shards]
+                for future in as_completed(futures):
+                    record(future.result())
+
+    click.echo(f'✅ חושבו {users} תלושים ב-{time.perf_counter() - started:.1f} שניות')
+
+
+def _stale_pay_users(limit):
+    return [row[0] for row in db.session.query(Shift.user_id).join(User, Shift.user_id == User.id).filter(
+        stale_pay_filter(db.func.coalesce(User.hourly_wage, 0.0))
+    ).distinct().order_by(Shift.user_id).limit(limit)]
+
+
+@payroll_cli.command('backfill-shifts')
+@click.option('--batch-size', default=100, show_default=True, help='משתמשים לכל טרנזקציה')
+def backfill_shifts(batch_size):
+    """מילוי עמודות השכר השמורות של משמרות שטרם חושבו (אפשר להריץ ברקע, בכמה סבבים)."""
+    started = time.perf_counter()
+    done = set()
+    while True:
+        user_ids = [user_id for user_id in _stale_pay_users(batch_size) if user_id not in done]
+        if not user_ids:
+            break
+        for user in User.query.filter(User.id.in_(user_ids)):
+            refresh_shift_pay(user)
+        # כל מנה בטרנזקציה קצרה משלה - לא נועלים את הטבלה לאורך כל המילוי
+        db.session.commit()
+        db.session.expunge_all()
+        done.update(user_ids)
+        click.echo(f'  {len(done)} משתמשים עודכנו')
+
+    click.echo(f'✅ המילוי הסתיים ב-{time.perf_counter() - started:.1f} שניות')
+
+
+@payroll_cli.command('rebuild-tax-year')
+@click.argument('year', type=int)
+@click.option('--through-month', type=click.IntRange(0, 12),
+              help='עד איזה חודש (ברירת מחדל: 12, ובשנה הנוכחית - החודש שהסתיים לאחרונה)')
+@click.option('--batch-size', default=DEFAULT_SHARD_SIZE, show_default=True, help='משתמשים לכל טרנזקציה')
+def rebuild_tax_year(year, through_month, batch_size):
+    """בנייה מחדש של המצטברים השנתיים (tax_year_totals) מהיסטוריית המשמרות."""
+    if through_month is None:
+        today = datetime.today()
+        through_month = 12 if year < today.year else today.month - 1
+
+    started = time.perf_counter()
+    user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+    for i in range(0, len(user_ids), batch_size):
+        batch = user_ids[i:i + batch_size]
+        totals = year_to_date(batch, f'{year:04d}-01')
+        rebuild(totals, batch, year, through_month)
+        db.session.commit()
+        db.session.expunge_all()
+        click.echo(f'  {min(i + batch_size, len(user_ids))} משתמשים עודכנו')
+
+    click.echo(f'✅ המצטברים ל-{year} עד חודש {through_month} נבנו ב-{time.perf_counter() - started:.1f} שניות')
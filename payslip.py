@@ -0,0 +1,196 @@
+# payslip.py
+# מנוע תלושי שכר חודשיים: ברוטו -> נטו לקבוצה של משתמשים במעבר וקטורי אחד
+# הטעינה היא מספר קבוע של שאילתות (משתמשים, ילדים, משמרות, יישובים) ללא תלות במספר המשתמשים
+import numpy as np
+from sqlalchemy import or_
+from models import db, User, Shift, Child, TaxExemptCity
+from months import month_bounds
+from overtime import OvertimeStream, week_start
+from payroll import minutes_to_hours, round_pay, shabbat_premium_batch, shift_minutes_batch, shift_start_minutes_batch
+from settlements import resolve_city
+from shabbat import city_zone, shabbat_minutes_by_zone
+
+# מדרגות מס הכנסה חודשיות 2025: (תקרת המדרגה, שיעור). None - ללא תקרה
+TAX_BRACKETS = (
+    (7010, 0.10),
+    (10060, 0.14),
+    (16150, 0.20),
+    (22440, 0.31),
+    (46690, 0.35),
+    (60130, 0.47),
+    (None, 0.50),
+)
+CREDIT_POINT_VALUE = 242  # שווי נקודת זיכוי לחודש
+
+# ביטוח לאומי + מס בריאות (חלק העובד): שיעור מופחת עד 60% מהשכר הממוצע, שיעור מלא עד התקרה
+NATIONAL_INSURANCE_BRACKETS = (
+    (7522, 0.0427),
+    (50695, 0.1217),
+)
+
+WOMAN_CREDIT_POINTS = 0.5
+DEGREE_CREDIT_POINTS = 1.0
+
+
+# נקודות זיכוי לילד לפי גיל (בפישוט): שנת הלידה, גילאי 1-5, גילאי 6-17
+def child_credit_points(age):
+    if age < 0 or age >= 18:
+        return 0.0
+    if age == 0:
+        return 1.5
+    if age <= 5:
+        return 2.5
+    return 1.0
+
+
+def credit_points(user, children, on_date):
+    points = user.tax_credit_points if user.tax_credit_points is not None else 2.25
+    if user.gender == "נקבה":
+        points += WOMAN_CREDIT_POINTS
+    # תואר ראשון - נקודה אחת בשנת המס שאחרי סיום התואר
+    if user.has_degree and user.degree_year and on_date.year == user.degree_year + 1:
+        points += DEGREE_CREDIT_POINTS
+    for birth_date in children:
+        if birth_date:
+            points += child_credit_points(on_date.year - birth_date.year)
+    return points
+
+
+# מס מדורג על מערך של סכומים - כל מדרגה מחושבת על כל המערך בבת אחת
+def progressive(amounts, brackets):
+    amounts = np.asarray(amounts, dtype=float)
+    total = np.zeros_like(amounts)
+    lower = 0.0
+    for upper, rate in brackets:
+        width = np.inf if upper is None else upper - lower
+        total += np.clip(amounts - lower, 0.0, width) * rate
+        if upper is None:
+            break
+        lower = upper
+    return total
+
+
+# city_cap - מה שנותר מהתקרה השנתית של היישוב המזכה אחרי החודשים הקודמים בשנת המס
+def calculate_net_batch(gross, points, city_percent, city_cap):
+    gross = np.asarray(gross, dtype=float)
+    tax_before_credits = progressive(gross, TAX_BRACKETS)
+    credit = np.asarray(points, dtype=float) * CREDIT_POINT_VALUE
+    # הנחת יישוב מזכה: אחוז מההכנסה עד יתרת התקרה
+    city_percent = np.asarray(city_percent, dtype=float)
+    city_income = np.where(city_percent > 0, np.minimum(gross, np.maximum(np.asarray(city_cap, dtype=float), 0.0)), 0.0)
+    city_discount = city_percent * city_income
+
+    income_tax = np.maximum(tax_before_credits - credit, 0.0)
+    city_discount = np.minimum(city_discount, income_tax)
+    income_tax = income_tax - city_discount
+    national_insurance = progressive(np.minimum(gross, NATIONAL_INSURANCE_BRACKETS[-1][0]), NATIONAL_INSURANCE_BRACKETS)
+
+    return {
+        "income_tax": round_pay(income_tax),
+        "credit": round_pay(np.minimum(credit, tax_before_credits)),
+        "city_income": round_pay(city_income),
+        "city_discount": round_pay(city_discount),
+        "national_insurance": round_pay(national_insurance),
+        "net": round_pay(gross - round_pay(income_tax) - round_pay(national_insurance)),
+    }
+
+
+def load_month(user_ids, month):
+    start, end = month_bounds(month)
+    users = User.query.filter(User.id.in_(user_ids)).order_by(User.id).all()
+    children = {}
+    for user_id, birth_date in db.session.query(Child.user_id, Child.birth_date).filter(Child.user_id.in_(user_ids)):
+        children.setdefault(user_id, []).append(birth_date)
+    # השבוע הראשון מתחיל לפעמים בחודש הקודם - המשמרות שלו נדרשות למונה השבועי
+    shifts = db.session.query(Shift.user_id, Shift.date, Shift.start_time, Shift.end_time).filter(
+        Shift.user_id.in_(user_ids),
+        Shift.date >= week_start(start),
+        Shift.date < end
+    ).order_by(Shift.user_id, Shift.date, Shift.start_time).all()
+    cities = match_tax_cities({user.id: (user.settlement_code, user.city) for user in users})
+    return users, children, shifts, cities
+
+
+# entries: מפתח -> (סמל יישוב או None, שם היישוב). מחזיר מפתח -> TaxExemptCity או None, בשאילתה אחת.
+# התאמה לפי סמל יישוב; בלי סמל שמור השם מזוהה באינדקס שבזיכרון,
+# ושם זהה לשם בטבלת הפטורים נשאר גיבוי (למשל לפני שהורץ import_settlements.py)
+def match_tax_cities(entries):
+    codes = {key: code or resolve_city(name) for key, (code, name) in entries.items()}
+    wanted = {code for code in codes.values() if code is not None}
+    names = {name.strip() for _, name in entries.values() if name}
+    rows = TaxExemptCity.query.filter(or_(
+        TaxExemptCity.settlement_code.in_(wanted),
+        TaxExemptCity.city_name.in_(names),
+    )).all() if wanted or names else []
+    by_code = {city.settlement_code: city for city in rows if city.settlement_code is not None}
+    by_name = {city.city_name: city for city in rows}
+    return {
+        key: by_code.get(codes[key]) or by_name.get((name or "").strip())
+        for key, (_, name) in entries.items()
+    }
+
+
+# ytd - מצטבר שנתי לכל משתמש עד החודש הקודם (TaxYearTotal, ראו tax_year.py). בלעדיו החודש
+# מחושב כאילו הוא הראשון בשנת המס
+def compute_payslips(user_ids, month, ytd=None):
+    users, children, shifts, cities = load_month(user_ids, month)
+    if not users:
+        return []
+    month_start = month_bounds(month)[0]
+    position = {user.id: i for i, user in enumerate(users)}
+    n = len(users)
+
+    # עמודות המשמרות של כל המשתמשים יחד
+    owner = np.fromiter((position[s.user_id] for s in shifts), dtype=np.int64, count=len(shifts))
+    wages = np.array([user.hourly_wage or 0.0 for user in users], dtype=float)
+    work_days = np.array([user.work_days_per_week for user in users])
+    minutes = shift_minutes_batch([s.start_time for s in shifts], [s.end_time for s in shifts])
+    dates = [s.date for s in shifts]
+    pay, tiers = OvertimeStream().pay(owner, dates, minutes_to_hours(minutes), wages[owner], work_days[owner])
+
+    # המשמרות מלפני תחילת החודש שימשו רק לצבירה השבועית
+    in_month = np.fromiter((d >= month_start for d in dates), dtype=bool, count=len(dates))
+    shifts = [s for s, keep in zip(shifts, in_month) if keep]
+    owner, minutes, pay = owner[in_month], minutes[in_month], pay[in_month]
+    tiers = {name: values[in_month] for name, values in tiers.items()}
+
+    # דקות שבת/חג - חיפוש אחד לכל אזור זמני שבת
+    start_minutes = shift_start_minutes_batch([s.date for s in shifts], [s.start_time for s in shifts])
+    zones = np.array([city_zone(user.city) for user in users])
+    shabbat_minutes = shabbat_minutes_by_zone(zones[owner], start_minutes, minutes)
+    premium = shabbat_premium_batch(shabbat_minutes, wages[owner])
+
+    def per_user(values):
+        return np.bincount(owner, weights=values, minlength=n)
+
+    gross = round_pay(per_user(pay + premium))
+    points = np.array([credit_points(user, children.get(user.id, []), month_start) for user in users], dtype=float)
+    city_rows = [cities[user.id] for user in users]
+    city_percent = np.array([c.tax_discount_percent if c else 0.0 for c in city_rows], dtype=float)
+    ytd = ytd or {}
+    used_cap = np.array([ytd[user.id].city_income if user.id in ytd else 0.0 for user in users], dtype=float)
+    city_cap = np.array([c.annual_cap if c else 0.0 for c in city_rows], dtype=float) - used_cap
+    net = calculate_net_batch(gross, points, city_percent, city_cap)
+
+    shift_count = np.bincount(owner, minlength=n)
+    tier_hours = {name: per_user(values) for name, values in tiers.items()}
+    shabbat_hours = per_user(shabbat_minutes / 60)
+
+    return [
+        {
+            "user_id": user.id,
+            "month": month,
+            "shift_count": int(shift_count[i]),
+            "hours": {name: float(values[i]) for name, values in tier_hours.items()},
+            "shabbat_hours": float(shabbat_hours[i]),
+            "gross": float(gross[i]),
+            "credit_points": float(points[i]),
+            "income_tax": float(net["income_tax"][i]),
+            "credit": float(net["credit"][i]),
+            "city_income": float(net["city_income"][i]),
+            "city_discount": float(net["city_discount"][i]),
+            "national_insurance": float(net["national_insurance"][i]),
+            "net": float(net["net"][i]),
+        }
+        for i, user in enumerate(users)
+    ]
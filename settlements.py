@@ -0,0 +1,97 @@
+# settlements.py
+# זיהוי יישוב לפי שם חופשי: שם מנורמל -> סמל יישוב (all_cities.csv של הלמ"ס).
+# הנרמול מוריד ניקוד, רווחים, מקפים וסימני פיסוק, מאחד אותיות סופיות ו-יי/וו כפולים (כתיב מלא/חסר),
+# כך ש"תל-אביב יפו", "תל אביב - יפו", "TEL AVIV - YAFO" ו"קריית שמונה"/"קרית שמונה" מגיעים לאותו סמל.
+# האינדקס נטען פעם אחת לזיכרון (מילון)
+import csv
+import os
+import re
+from flask import current_app
+from cache import StampedValue
+from models import SettlementAlias
+
+SETTLEMENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "all_cities.csv")
+# הקובץ בקידוד Windows-1255 (עברית ישנה), עם רווחים בסוף כל שדה
+SETTLEMENTS_ENCODING = "cp1255"
+
+FINAL_LETTERS = str.maketrans("ךםןףץ", "כמנפצ")
+# ניקוד וטעמים (כולל המקף העברי ־)
+_NIQQUD = re.compile("[\u0591-\u05C7]")
+_PUNCTUATION = re.compile(r"[\s\-–—'\"`׳״.,()]+")
+_PARENTHESES = re.compile(r"\(([^)]*)\)")
+_DOUBLED = re.compile("([יו])\\1+")
+
+
+def normalize_city_name(name):
+    name = _NIQQUD.sub("", str(name or "")).lower().translate(FINAL_LETTERS)
+    return _DOUBLED.sub(r"\1", _PUNCTUATION.sub("", name))
+
+
+def read_settlements(path=SETTLEMENTS_FILE):
+    settlements = []
+    with open(path, encoding=SETTLEMENTS_ENCODING, newline="") as f:
+        for row in csv.DictReader(f):
+            code = int(row["סמל_ישוב"])
+            # סמל 0 - "לא רשום"
+            if code == 0:
+                continue
+            settlements.append({
+                "code": code,
+                "name": row["שם_ישוב"].strip(),
+                "name_en": row["שם_ישוב_לועזי"].strip() or None,
+                "district": row["שם_נפה"].strip() or None,
+            })
+    return settlements
+
+
+# גרסאות שם ליישוב: השם המלא, השם בלי הסוגריים ("בן שמן (מושב)" -> "בן שמן"), התוכן שבסוגריים
+# ("ג'ש (גוש חלב)" -> "גוש חלב"), כל חלק בשם מפוצל ("תל אביב - יפו" -> "תל אביב"), והשם הלועזי
+def _variants(settlement):
+    name = settlement["name"]
+    variants = [_PARENTHESES.sub("", name)]
+    variants += _PARENTHESES.findall(name)
+    variants += [part for part in re.split(r"\s+-\s+", name) if part != name]
+    if settlement["name_en"]:
+        variants.append(settlement["name_en"])
+    return variants
+
+
+# השם הרשמי תמיד מנצח; גרסה שמובילה ליותר מיישוב אחד (למשל "שבט") לא נכנסת לאינדקס
+def build_aliases(settlements):
+    aliases = {}
+    for settlement in settlements:
+        aliases[normalize_city_name(settlement["name"])] = settlement["code"]
+
+    candidates = {}
+    for settlement in settlements:
+        for variant in _variants(settlement):
+            alias = normalize_city_name(variant)
+            if alias and alias not in aliases:
+                candidates.setdefault(alias, set()).add(settlement["code"])
+
+    for alias, codes in candidates.items():
+        if len(codes) == 1:
+            aliases[alias] = codes.pop()
+    return aliases
+
+
+def _load_aliases():
+    return dict(SettlementAlias.query.with_entities(SettlementAlias.alias, SettlementAlias.settlement_code).all())
+
+
+# קובץ חותמת שסקריפט הייבוא נוגע בו - כמו במטמון היישובים של /api/cities
+_index = StampedValue(lambda: os.path.join(current_app.instance_path, "settlements.stamp"), _load_aliases)
+
+
+def get_settlement_index():
+    return _index.get()
+
+
+def resolve_city(name):
+    if not name:
+        return None
+    return get_settlement_index().get(normalize_city_name(name))
+
+
+def invalidate_settlement_index():
+    _index.invalidate()
@@ -0,0 +1,192 @@
+# shabbat.py
+# אינדקס חלונות שבת/חג: מערכים ממוינים של זמני כניסה ויציאה (בדקות מאז 1970)
+# מאפשר לחשב כמה דקות ממשמרת נופלות בשבת או בחג ב-O(log n) בעזרת חיפוש בינארי
+import hashlib
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from cache import StampedValue, touch_stamp
+from payroll import shift_minutes
+from settlements import normalize_city_name, resolve_city
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SHABBAT_FILE = os.path.join(BASE_DIR, "shabat_times_2025.xlsx")
+# מטמון בינארי שנוצר ע"י ingest_shabbat.py - קובץ npy לכל אזור, נטען ב-mmap
+CACHE_DIR = os.path.join(BASE_DIR, "shabbat_cache")
+DEFAULT_ZONE = "TelAviv"
+
+# התאמה בין יישוב המשתמש לעמודות זמני השבת בקובץ
+CITY_ZONES = {
+    "ירושלים": "Jerusalem",
+    "תל אביב - יפו": "TelAviv",
+    "תל אביב": "TelAviv",
+    "חיפה": "Hayfa",
+    "באר שבע": "BeerSheva",
+}
+
+EPOCH = datetime(1970, 1, 1)
+# קובץ חותמת ש-save_cache נוגע בו בסוף כל ייבוא - כך כל תהליך יודע שהמטמון שלו ישן
+STAMP_FILE = "cache.stamp"
+
+
+def to_minutes(dt):
+    return (dt - EPOCH) // timedelta(minutes=1)
+
+
+class ShabbatIndex:
+    def __init__(self, starts, ends):
+        # starts/ends ממוינים וזרים זה לזה (חלונות חופפים כבר אוחדו)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.cumulative = np.concatenate(([0], np.cumsum(self.ends - self.starts)))
+
+    @classmethod
+    def from_windows(cls, windows):
+        starts, ends = [], []
+        for start, end in sorted(windows):
+            # חג שצמוד לשבת (או חג בן יומיים) - איחוד לחלון אחד
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        return cls(starts, ends)
+
+    # סך דקות החלונות שמסתיימים עד הרגע t (כולל חלק מחלון פתוח)
+    def _covered_until(self, t):
+        k = np.searchsorted(self.starts, t, side="right")
+        last = np.maximum(k - 1, 0)
+        partial = np.minimum(t, self.ends[last]) - self.starts[last]
+        return np.where(k > 0, self.cumulative[last] + partial, 0)
+
+    def minutes_inside_batch(self, start_minutes, end_minutes):
+        start_minutes = np.asarray(start_minutes, dtype=np.int64)
+        end_minutes = np.asarray(end_minutes, dtype=np.int64)
+        if len(self.starts) == 0:
+            return np.zeros(np.broadcast(start_minutes, end_minutes).shape, dtype=np.int64)
+        return self._covered_until(end_minutes) - self._covered_until(start_minutes)
+
+    def minutes_inside(self, start_dt, end_dt):
+        return int(self.minutes_inside_batch(to_minutes(start_dt), to_minutes(end_dt)))
+
+    def shift_minutes_inside(self, shift):
+        start = to_minutes(datetime.combine(shift.date, shift.start_time))
+        return int(self.minutes_inside_batch(start, start + shift_minutes(shift)))
+
+
+def _as_time(value):
+    if isinstance(value, str):
+        return datetime.strptime(value.strip()[:5], "%H:%M").time()
+    return value
+
+
+# החלונות מהקבצים: כניסה בערב שלפני התאריך, יציאה בתאריך עצמו
+# אפשר להעביר כמה קבצים (שנה לכל קובץ) - החלונות מאוחדים לפי אזור
+def load_windows(paths=(SHABBAT_FILE,)):
+    import pandas as pd
+
+    if isinstance(paths, str):
+        paths = [paths]
+
+    windows = {}
+    for path in paths:
+        df = pd.read_excel(path)
+        zones = [column[:-len("_in")] for column in df.columns
+                 if column.endswith("_in") and f"{column[:-len('_in')]}_out" in df.columns]
+        df = df.dropna(subset=["date"])
+        for row in df.to_dict("records"):
+            day = pd.Timestamp(row["date"]).date()
+            for zone in zones:
+                if pd.isna(row[f"{zone}_in"]) or pd.isna(row[f"{zone}_out"]):
+                    continue
+                start = datetime.combine(day - timedelta(days=1), _as_time(row[f"{zone}_in"]))
+                end = datetime.combine(day, _as_time(row[f"{zone}_out"]))
+                windows.setdefault(zone, []).append((to_minutes(start), to_minutes(end)))
+    return windows
+
+
+def load_indexes(paths=(SHABBAT_FILE,)):
+    return {zone: ShabbatIndex.from_windows(windows) for zone, windows in load_windows(paths).items()}
+
+
+# כל אזור נשמר כמערך int64 בגודל (2, n): שורה 0 כניסות, שורה 1 יציאות
+def save_cache(indexes, directory=CACHE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith(".npy"):
+            os.remove(os.path.join(directory, name))
+    for zone, index in indexes.items():
+        np.save(os.path.join(directory, f"{zone}.npy"), np.vstack([index.starts, index.ends]))
+    touch_stamp(os.path.join(directory, STAMP_FILE))
+
+
+def load_cache(directory=CACHE_DIR):
+    indexes = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".npy"):
+            windows = np.load(os.path.join(directory, name), mmap_mode="r")
+            indexes[name[:-len(".npy")]] = ShabbatIndex(windows[0], windows[1])
+    return indexes
+
+
+_ZONES_BY_NAME = {normalize_city_name(name): zone for name, zone in CITY_ZONES.items()}
+
+
+# היישוב מזוהה כמו בפרטים האישיים: קודם לפי השם המנורמל ("תל-אביב יפו", "באר-שבע"), ואחר כך דרך
+# אינדקס השמות החלופיים של הלמ"ס ("TEL AVIV - YAFO") - יישוב שמגיע לסמל של אחד מהאזורים
+def city_zone(city):
+    zone = _ZONES_BY_NAME.get(normalize_city_name(city))
+    if zone is None:
+        code = resolve_city(city)
+        if code is not None:
+            zone = next((zone for name, zone in CITY_ZONES.items() if resolve_city(name) == code), None)
+    return zone or DEFAULT_ZONE
+
+
+# גרסת לוח השבתות: גיבוב של כל החלונות. נשמרת עם שכר המשמרות (shifts.shabbat_version) - אחרי ייבוא
+# של לוח אחר השורות שחושבו לפי הלוח הקודם מחושבות מחדש
+def _calendar_version(indexes):
+    digest = hashlib.sha1()
+    for zone in sorted(indexes):
+        digest.update(zone.encode())
+        digest.update(np.ascontiguousarray(indexes[zone].starts).tobytes())
+        digest.update(np.ascontiguousarray(indexes[zone].ends).tobytes())
+    return digest.hexdigest()[:16]
+
+
+# מהמטמון הבינארי אם קיים, אחרת מקובץ ה-Excel
+def _load():
+    if os.path.isdir(CACHE_DIR) and any(name.endswith(".npy") for name in os.listdir(CACHE_DIR)):
+        indexes = load_cache(CACHE_DIR)
+    else:
+        indexes = load_indexes()
+    return indexes, _calendar_version(indexes)
+
+
+# האינדקס נטען פעם אחת לכל תהליך ונטען מחדש כשהחותמת משתנה (ingest_shabbat.py)
+_indexes = StampedValue(lambda: os.path.join(CACHE_DIR, STAMP_FILE), _load)
+
+
+def get_zone_index(zone):
+    indexes = _indexes.get()[0]
+    return indexes.get(zone) or indexes[DEFAULT_ZONE]
+
+
+def calendar_version():
+    return _indexes.get()[1]
+
+
+def get_shabbat_index(city=None):
+    return get_zone_index(city_zone(city))
+
+
+# דקות שבת/חג לכל משמרת, כשלכל משמרת אזור משלה (לפי יישוב המשתמש) - חיפוש אחד לכל אזור
+def shabbat_minutes_by_zone(zones, start_minutes, minutes):
+    zones = np.asarray(zones)
+    start_minutes = np.asarray(start_minutes, dtype=np.int64)
+    minutes = np.asarray(minutes, dtype=np.int64)
+    result = np.zeros(len(start_minutes), dtype=np.int64)
+    for zone in set(zones.tolist()):
+        mask = zones == zone
+        result[mask] = get_zone_index(zone).minutes_inside_batch(start_minutes[mask], start_minutes[mask] + minutes[mask])
+    return result
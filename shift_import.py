@@ -0,0 +1,115 @@
+# shift_import.py
+# ייבוא מרוכז של משמרות (CSV או מערך JSON): בדיקת כל השורות במעבר וקטורי אחד,
+# דחיית כפילויות וחפיפות, והכנסה של כל המשמרות בפקודת executemany אחת בטרנזקציה אחת
+import numpy as np
+from sqlalchemy import insert
+from models import db, Shift
+from shifts import EMPTY_SHIFT_ERROR, is_empty, overlap_guard, shift_bounds, user_intervals
+from summaries import refresh_shift_months
+
+REQUIRED_COLUMNS = ('date', 'start_time', 'end_time')
+MAX_ROWS = 20000
+
+
+def read_csv(file):
+    import pandas as pd
+    return pd.read_csv(file, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+
+
+def read_json(records):
+    import pandas as pd
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise ValueError('יש לשלוח מערך JSON של משמרות')
+    return pd.DataFrame.from_records(records).fillna('').astype(str)
+
+
+def _parse_times(series):
+    import pandas as pd
+    series = series.str.strip()
+    times = pd.to_datetime(series, format='%H:%M', errors='coerce')
+    return times.fillna(pd.to_datetime(series, format='%H:%M:%S', errors='coerce'))
+
+
+def validate_shifts(df, user_id):
+    import pandas as pd
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f'עמודות חסרות: {", ".join(missing)}')
+    if len(df) > MAX_ROWS:
+        raise ValueError(f'ניתן לייבא עד {MAX_ROWS} משמרות בבת אחת')
+
+    errors = [[] for _ in range(len(df))]
+
+    # פענוח כל העמודות בבת אחת - ערך לא תקין הופך ל-NaT
+    dates = pd.to_datetime(df['date'].str.strip(), format='%Y-%m-%d', errors='coerce')
+    starts = _parse_times(df['start_time'])
+    ends = _parse_times(df['end_time'])
+    for i in np.flatnonzero(dates.isna().to_numpy()):
+        errors[i].append('תאריך לא תקין (YYYY-MM-DD)')
+    for i in np.flatnonzero(starts.isna().to_numpy()):
+        errors[i].append('שעת התחלה לא תקינה (HH:MM)')
+    for i in np.flatnonzero(ends.isna().to_numpy()):
+        errors[i].append('שעת סיום לא תקינה (HH:MM)')
+
+    valid = np.flatnonzero(~(dates.isna() | starts.isna() | ends.isna()).to_numpy())
+    notes = df['note'] if 'note' in df.columns else pd.Series([''] * len(df))
+    rows = [
+        {
+            'user_id': user_id,
+            'date': dates.iloc[i].date(),
+            'start_time': starts.iloc[i].time(),
+            'end_time': ends.iloc[i].time(),
+            'note': notes.iloc[i].strip() or None,
+        }
+        for i in valid
+    ]
+    if not rows:
+        return rows, errors
+
+    new_starts, new_ends = shift_bounds([r['date'] for r in rows], [r['start_time'] for r in rows],
+                                        [r['end_time'] for r in rows])
+
+    # מול המשמרות הקיימות במסד - שאילתה אחת על האינדקס (user_id, date)
+    existing = user_intervals(user_id, min(r['date'] for r in rows), max(r['date'] for r in rows))
+    overlapping = existing.overlaps(new_starts, new_ends)
+    empty = is_empty(new_starts, new_ends)
+    for k, i in enumerate(valid):
+        if empty[k]:
+            errors[i].append(EMPTY_SHIFT_ERROR)
+        elif existing.is_duplicate(new_starts[k], new_ends[k]):
+            errors[i].append('משמרת זהה כבר קיימת')
+        elif overlapping[k]:
+            errors[i].append('חופפת למשמרת קיימת')
+
+    # בתוך הקובץ עצמו: מיון לפי התחלה, וכל משמרת נבדקת מול המשמרות שלפניה
+    order = np.argsort(new_starts, kind='stable')
+    seen = set()
+    latest_end = None
+    for k in order:
+        if empty[k]:
+            continue
+        i = valid[k]
+        pair = (int(new_starts[k]), int(new_ends[k]))
+        if pair in seen:
+            errors[i].append('משמרת כפולה בקובץ')
+        elif latest_end is not None and new_starts[k] < latest_end:
+            errors[i].append('חופפת למשמרת אחרת בקובץ')
+        seen.add(pair)
+        latest_end = new_ends[k] if latest_end is None else max(latest_end, new_ends[k])
+
+    return rows, errors
+
+
+# הכול או כלום: אם יש שגיאה באחת השורות לא נשמרת אף משמרת
+def import_shifts(df, user):
+    rows, errors = validate_shifts(df, user.id)
+    report = [{'row': i + 1, 'errors': row_errors} for i, row_errors in enumerate(errors) if row_errors]
+    if report or not rows:
+        return 0, report
+
+    with overlap_guard('חלק מהמשמרות חופפות למשמרות שנוספו בינתיים'):
+        db.session.execute(insert(Shift.__table__), rows)
+        refresh_shift_months(user, {row['date'] for row in rows})
+        db.session.commit()
+    return len(rows), report
@@ -0,0 +1,265 @@
+# shifts.py
+# שאילתות על טבלת המשמרות - רשימה לפי חודש עם דפדוף keyset על האינדקס (user_id, date),
+# ובדיקת חפיפות בין משמרות
+from contextlib import contextmanager
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from models import db, Shift
+from overtime import weekly_pay_batch, week_start
+from payroll import (EPOCH_ORDINAL, minutes_to_hours, round_pay, shabbat_premium_batch, shift_minutes_batch,
+                     shift_start_minutes_batch, format_duration)
+from months import month_bounds, month_key
+from shabbat import calendar_version, get_shabbat_index
+
+PAGE_SIZE = 50
+EMPTY_SHIFT_ERROR = 'שעת הסיום זהה לשעת ההתחלה'
+OVERLAP_ERROR = 'המשמרת חופפת למשמרת קיימת'
+
+
+class ShiftOverlap(ValueError):
+    pass
+
+
+# שמירת משמרות: אילוץ החפיפה ב-Postgres תופס משמרת שנוספה במקביל אחרי הבדיקה של find_shift_conflict -
+# הטרנזקציה מתבטלת והשגיאה חוזרת כ-ShiftOverlap עם הודעה למשתמש
+@contextmanager
+def overlap_guard(message=OVERLAP_ERROR):
+    try:
+        yield
+    except IntegrityError:
+        db.session.rollback()
+        raise ShiftOverlap(message)
+
+
+def latest_shift_month(user_id):
+    last = Shift.query.with_entities(Shift.date).filter_by(user_id=user_id).order_by(Shift.date.desc()).first()
+    return month_key(last[0]) if last else None
+
+
+# after הוא זוג (תאריך, מזהה) של השורה האחרונה בעמוד הקודם
+def shifts_page(user_id, month, after=None, page_size=PAGE_SIZE):
+    start, end = month_bounds(month)
+    query = Shift.query.filter(
+        Shift.user_id == user_id,
+        Shift.date >= start,
+        Shift.date < end
+    )
+    if after:
+        after_date, after_id = after
+        query = query.filter(or_(
+            Shift.date > after_date,
+            and_(Shift.date == after_date, Shift.id > after_id)
+        ))
+
+    # שורה אחת נוספת כדי לדעת אם יש עמוד הבא
+    shifts = query.order_by(Shift.date.asc(), Shift.id.asc()).limit(page_size + 1).all()
+    has_next = len(shifts) > page_size
+    shifts = shifts[:page_size]
+
+    # חישוב משכי המשמרות במעבר אחד על כל העמוד
+    minutes = shift_minutes_batch([s.start_time for s in shifts], [s.end_time for s in shifts])
+    durations = [format_duration(m) for m in minutes]
+    return shifts, durations, has_next
+
+
+# גבולות המשמרות בשניות מאז 1970. משמרת שחוצה חצות מסתיימת למחרת - כמו ב-get_shift_duration
+def shift_bounds(dates, start_times, end_times):
+    days = np.fromiter((d.toordinal() - EPOCH_ORDINAL for d in dates), dtype=np.int64, count=len(dates))
+    starts = np.fromiter((t.hour * 3600 + t.minute * 60 + t.second for t in start_times), dtype=np.int64, count=len(dates))
+    ends = np.fromiter((t.hour * 3600 + t.minute * 60 + t.second for t in end_times), dtype=np.int64, count=len(dates))
+    starts = days * 86400 + starts
+    return starts, starts + (ends - (starts % 86400)) % 86400
+
+
+# אותו כלל כמו אילוץ shifts_no_overlap ב-Postgres: טווח חצי-פתוח [התחלה, סיום), ומשמרת באורך אפס
+# היא טווח ריק שלא חופף לשום דבר - ולכן היא נדחית כבר בבדיקה (is_empty) ולא נשמרת
+def is_empty(starts, ends):
+    return np.asarray(ends) <= np.asarray(starts)
+
+
+class ShiftIntervals:
+    # משמרות קיימות ממוינות לפי התחלה, עם מקסימום מצטבר של זמני הסיום -
+    # כך גם נתונים ישנים שכבר חופפים זה לזה נבדקים נכון, בחיפוש בינארי אחד לכל משמרת.
+    # משמרות ישנות באורך אפס לא נכנסות, כמו שהאילוץ מתעלם מטווח ריק
+    def __init__(self, starts, ends):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        keep = ~is_empty(starts, ends)
+        starts, ends = starts[keep], ends[keep]
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.max_ends = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+        self.pairs = set(zip(self.starts.tolist(), self.ends.tolist()))
+
+    def is_duplicate(self, start, end):
+        return (int(start), int(end)) in self.pairs
+
+    # חפיפה: קיימת משמרת שמתחילה לפני סוף החדשה ומסתיימת אחרי תחילתה
+    def overlaps(self, starts, ends):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        before = np.searchsorted(self.starts, ends, side="left")
+        if len(self.max_ends) == 0:
+            return np.zeros(len(starts), dtype=bool)
+        latest_end = self.max_ends[np.maximum(before - 1, 0)]
+        return (before > 0) & (latest_end > starts)
+
+
+# המשמרות הקיימות של המשתמש בטווח התאריכים, כולל יום לפני ויום אחרי - משמרות לילה חוצות חצות.
+# exclude_id - משמרת שמתעדכנת, שלא תיחשב כחופפת לעצמה
+def user_intervals(user_id, first_date, last_date, exclude_id=None):
+    query = db.session.query(Shift.date, Shift.start_time, Shift.end_time).filter(
+        Shift.user_id == user_id,
+        Shift.date >= first_date - timedelta(days=1),
+        Shift.date <= last_date + timedelta(days=1)
+    )
+    if exclude_id is not None:
+        query = query.filter(Shift.id != exclude_id)
+    rows = query.all()
+    starts, ends = shift_bounds([r.date for r in rows], [r.start_time for r in rows], [r.end_time for r in rows])
+    return ShiftIntervals(starts, ends)
+
+
+# בדיקת משמרת בודדת לפני שמירה - מחזירה הודעת שגיאה או None
+def find_shift_conflict(user_id, shift_date, start_time, end_time, exclude_id=None):
+    starts, ends = shift_bounds([shift_date], [start_time], [end_time])
+    if is_empty(starts, ends)[0]:
+        return EMPTY_SHIFT_ERROR
+    existing = user_intervals(user_id, shift_date, shift_date, exclude_id)
+    if existing.is_duplicate(starts[0], ends[0]):
+        return 'משמרת זהה כבר קיימת'
+    if existing.overlaps(starts, ends)[0]:
+        return OVERLAP_ERROR
+    return None
+
+
+# גרסת חישוב השכר שנשמר בשורות המשמרות - להעלות כשכללי החישוב משתנים, וכל השורות יחושבו מחדש
+PAY_VERSION = 3
+TIER_COLUMNS = {"100%": "minutes_100", "125%": "minutes_125", "150%": "minutes_150", "200%": "minutes_200"}
+
+
+# חישוב השכר לרצף משמרות של משתמש אחד, ממוינות כרונולוגית ומתחילות בתחילת שבוע
+def _compute_pay(user, shifts):
+    count = len(shifts)
+    minutes = shift_minutes_batch([s.start_time for s in shifts], [s.end_time for s in shifts])
+    wage = user.hourly_wage or 0.0
+    pay, tiers = weekly_pay_batch([user.id] * count, [s.date for s in shifts], minutes_to_hours(minutes),
+                                  wage, [user.work_days_per_week] * count)
+    start_minutes = shift_start_minutes_batch([s.date for s in shifts], [s.start_time for s in shifts])
+    calendar = calendar_version()
+    shabbat = get_shabbat_index(user.city).minutes_inside_batch(start_minutes, start_minutes + minutes)
+    premium = shabbat_premium_batch(shabbat, wage)
+    return {
+        "rate": wage,
+        "calendar": calendar,
+        "minutes": minutes,
+        "tier_minutes": {name: np.rint(values * 60).astype(np.int64) for name, values in tiers.items()},
+        "shabbat": shabbat,
+        "pay": pay,
+        "gross": round_pay(pay + premium),
+    }
+
+
+def _store_pay(shifts, computed):
+    for i, shift in enumerate(shifts):
+        shift.pay_version = PAY_VERSION
+        shift.duration_minutes = int(computed["minutes"][i])
+        for name, column in TIER_COLUMNS.items():
+            setattr(shift, column, int(computed["tier_minutes"][name][i]))
+        shift.shabbat_minutes = int(computed["shabbat"][i])
+        shift.shabbat_version = computed["calendar"]
+        shift.pay_rate = computed["rate"]
+        shift.gross_pay = float(computed["gross"][i])
+
+
+# חישוב מחדש ושמירה של עמודות השכר: לשבועות המלאים של התאריכים שהשתנו (משמרת משפיעה על
+# המשמרות שאחריה באותו שבוע), או לכל ההיסטוריה כשהשכר השעתי, היישוב או שבוע העבודה משתנים
+def refresh_shift_pay(user, days=None):
+    query = Shift.query.filter(Shift.user_id == user.id)
+    if days:
+        query = query.filter(
+            Shift.date >= week_start(min(days)),
+            Shift.date <= week_start(max(days)) + timedelta(days=6)
+        )
+    shifts = query.order_by(Shift.date, Shift.start_time, Shift.id).all()
+    if shifts:
+        _store_pay(shifts, _compute_pay(user, shifts))
+
+
+# שורה ישנה: גרסת חישוב אחרת, שכר שעתי אחר (wage - ערך או ביטוי SQL) או לוח שבתות אחר
+def stale_pay_filter(wage):
+    calendar = calendar_version()
+    return (Shift.pay_version.is_(None) | (Shift.pay_version != PAY_VERSION) | (Shift.pay_rate != wage)
+            | Shift.shabbat_version.is_(None) | (Shift.shabbat_version != calendar))
+
+
+def _stale_filter(user):
+    return stale_pay_filter(user.hourly_wage or 0.0)
+
+
+def _is_fresh(shift, user):
+    return (shift.pay_version == PAY_VERSION and shift.pay_rate == (user.hourly_wage or 0.0)
+            and shift.shabbat_version == calendar_version())
+
+
+# שכר, מדרגות ושעות שבת לכמה משמרות של המשתמש בבת אחת. שורות שכבר חושבו נקראות כמו שהן;
+# אחרת שאילתה אחת מביאה גם את המשמרות שלפניהן באותו שבוע, והתוצאה נשמרת (מילוי עצל)
+def shift_pay_details(user, shift_ids):
+    wanted = set(shift_ids)
+    requested = Shift.query.filter(Shift.user_id == user.id, Shift.id.in_(wanted)).all()
+    if not requested:
+        return {}
+
+    if all(_is_fresh(shift, user) for shift in requested):
+        shifts = requested
+        minutes = np.array([s.duration_minutes for s in shifts], dtype=np.int64)
+        tier_hours = {name: np.array([getattr(s, column) for s in shifts]) / 60 for name, column in TIER_COLUMNS.items()}
+        shabbat = np.array([s.shabbat_minutes for s in shifts], dtype=np.int64)
+        gross = np.array([s.gross_pay for s in shifts], dtype=float)
+        rate = user.hourly_wage or 0.0
+    else:
+        shifts = Shift.query.filter(
+            Shift.user_id == user.id,
+            Shift.date >= week_start(min(s.date for s in requested)),
+            Shift.date <= max(s.date for s in requested)
+        ).order_by(Shift.date, Shift.start_time, Shift.id).all()
+        computed = _compute_pay(user, shifts)
+        minutes, shabbat, gross, rate = computed["minutes"], computed["shabbat"], computed["gross"], computed["rate"]
+        tier_hours = {name: values / 60 for name, values in computed["tier_minutes"].items()}
+        _store_pay(shifts, computed)
+        db.session.commit()
+
+    premium = shabbat_premium_batch(shabbat, rate)
+    return {
+        shift.id: {
+            "shift": shift,
+            "minutes": int(minutes[i]),
+            "tiers": {name: float(values[i]) for name, values in tier_hours.items()},
+            "pay": round(float(gross[i]) - float(premium[i]), 2),
+            "shabbat_hours": float(shabbat[i]) / 60,
+            "shabbat_premium": float(premium[i]),
+            "total": float(gross[i]),
+        }
+        for i, shift in enumerate(shifts)
+        if shift.id in wanted
+    }
+
+
+# סכומי החודש כ-SUM במסד על העמודות השמורות; שורות שטרם חושבו מחושבות קודם
+def month_pay_totals(user, month):
+    start, end = month_bounds(month)
+    in_month = (Shift.user_id == user.id) & (Shift.date >= start) & (Shift.date < end)
+    stale = db.session.query(Shift.date).filter(in_month, _stale_filter(user)).order_by(Shift.date).all()
+    if stale:
+        refresh_shift_pay(user, [stale[0][0], stale[-1][0]])
+        db.session.commit()
+
+    totals = db.session.query(
+        db.func.count(Shift.id),
+        db.func.coalesce(db.func.sum(Shift.duration_minutes), 0),
+        db.func.coalesce(db.func.sum(Shift.gross_pay), 0.0),
+    ).filter(in_month).one()
+    return {"shift_count": totals[0], "minutes": int(totals[1]), "gross": round(float(totals[2]), 2)}
@@ -0,0 +1,118 @@
+# simulator.py
+# סימולציית "מה אם" על כל היסטוריית המשמרות של משתמש: רשת של שכר שעתי × כללי שעות נוספות × יישובים.
+# ההיסטוריה נטענת פעם אחת כעמודות. הפירוק למדרגות מחושב פעם אחת לכל אורך שבוע עבודה (5/6) ודקות השבת
+# פעם אחת לכל אזור זמני שבת; משם הכול מצטמצם לסכומים חודשיים, וכל התרחישים מחושבים יחד בשידור של NumPy:
+# ברוטו[שכר, כללים, יישוב, חודש] = שכר * (שעות משוקללות[כללים, חודש] + שעות שבת[יישוב, חודש] * 50%)
+# הסכומים מעוגלים ברמת החודש ולא לכל משמרת, ולכן יכולים לסטות באגורות בודדות מהתלוש עצמו
+import math
+from datetime import date
+import numpy as np
+from models import db, Shift
+from overtime import DAILY_REGULAR_HOURS, OvertimeStream, TIER_NAMES
+from payroll import TIERS, SHABBAT_PREMIUM, minutes_to_hours, shift_minutes_batch, shift_start_minutes_batch
+from payslip import calculate_net_batch, credit_points, match_tax_cities
+from shabbat import city_zone, shabbat_minutes_by_zone
+
+LAW_MULTIPLIERS = tuple(multiplier for _, _, _, multiplier in TIERS)
+MAX_SCENARIOS = 500
+
+
+# כלל שעות נוספות: שם, שבוע עבודה (קובע את מכסת היום) ומכפיל לכל מדרגה בסדר של TIERS
+def parse_rule(data, default_work_days):
+    work_days = int(data.get('work_days') or default_work_days)
+    if work_days not in DAILY_REGULAR_HOURS:
+        raise ValueError(f'שבוע עבודה לא נתמך: {work_days}')
+    multipliers = tuple(float(m) for m in data.get('multipliers') or LAW_MULTIPLIERS)
+    if len(multipliers) != len(TIERS) or not all(math.isfinite(m) and m >= 0 for m in multipliers):
+        raise ValueError(f'נדרשים {len(TIERS)} מכפילים אי-שליליים')
+    return {'name': str(data.get('name') or f'{work_days}d'), 'work_days': work_days, 'multipliers': multipliers}
+
+
+class ShiftHistory:
+    def __init__(self, user):
+        rows = db.session.query(Shift.date, Shift.start_time, Shift.end_time).filter(
+            Shift.user_id == user.id
+        ).order_by(Shift.date, Shift.start_time).all()
+        self.dates = [row.date for row in rows]
+        self.minutes = shift_minutes_batch([row.start_time for row in rows], [row.end_time for row in rows])
+        self.start_minutes = shift_start_minutes_batch(self.dates, [row.start_time for row in rows])
+
+        # מספר חודש רץ (שנה * 12 + חודש); המשמרות ממוינות, כך שכל חודש הוא רצף אחד
+        month = np.fromiter((d.year * 12 + d.month - 1 for d in self.dates), dtype=np.int64, count=len(rows))
+        self.first_month = int(month[0]) if len(rows) else 0
+        self.month_count = int(month[-1]) - self.first_month + 1 if len(rows) else 0
+        self._starts = np.flatnonzero(np.r_[True, month[1:] != month[:-1]]) if len(rows) else month
+        self._present = month[self._starts] - self.first_month
+        self._tiers = {}
+        self._shabbat = {}
+
+    def month_starts(self):
+        return [date(m // 12, m % 12 + 1, 1) for m in range(self.first_month, self.first_month + self.month_count)]
+
+    # סכום לכל חודש לאורך הציר האחרון: (..., משמרות) -> (..., חודשים)
+    def monthly(self, values):
+        values = np.asarray(values, dtype=float)
+        result = np.zeros(values.shape[:-1] + (self.month_count,))
+        if len(self._starts):
+            result[..., self._present] = np.add.reduceat(values, self._starts, axis=-1)
+        return result
+
+    # שעות לכל משמרת ומדרגה (משמרות × מדרגות), עם הצבירה השבועית
+    def tier_hours(self, work_days):
+        if work_days not in self._tiers:
+            n = len(self.dates)
+            tiers = OvertimeStream().tiers(np.zeros(n), self.dates, minutes_to_hours(self.minutes),
+                                           np.full(n, work_days))
+            self._tiers[work_days] = np.column_stack([tiers[name] for name in TIER_NAMES])
+        return self._tiers[work_days]
+
+    def shabbat_hours(self, zone):
+        if zone not in self._shabbat:
+            minutes = shabbat_minutes_by_zone(np.full(len(self.dates), zone), self.start_minutes, self.minutes)
+            self._shabbat[zone] = self.monthly(minutes / 60)
+        return self._shabbat[zone]
+
+
+def simulate(user, wages, rules, cities):
+    history = ShiftHistory(user)
+    wages = np.asarray(wages, dtype=float)
+
+    # (כללים, חודשים): שעות כפול המכפיל של המדרגה
+    weighted = history.monthly(np.stack([
+        history.tier_hours(rule['work_days']) @ np.asarray(rule['multipliers']) for rule in rules
+    ]))
+    # (יישובים, חודשים)
+    shabbat = np.stack([history.shabbat_hours(city_zone(city)) for city in cities]) * SHABBAT_PREMIUM
+    gross = np.round(wages[:, None, None, None] * (weighted[None, :, None, :] + shabbat[None, None, :, :]), 2)
+
+    month_starts = history.month_starts()
+    children = [child.birth_date for child in user.children]
+    points = np.array([credit_points(user, children, start) for start in month_starts], dtype=float)
+    tax_cities = match_tax_cities({i: (None, city) for i, city in enumerate(cities)})
+    percent = np.array([tax_cities[i].tax_discount_percent if tax_cities[i] else 0.0 for i in range(len(cities))])
+    cap = np.array([tax_cities[i].annual_cap if tax_cities[i] else 0.0 for i in range(len(cities))])
+
+    # תקרת היישוב נצברת בתוך שנת המס: ההכנסה מתחילת השנה ועד לפני כל חודש (החודשים רצופים,
+    # כך שינואר של אותה שנה נמצא start.month - 1 מקומות אחורה, או בתחילת הטווח)
+    earlier = np.cumsum(gross, axis=-1) - gross
+    year_first = np.array([max(i - start.month + 1, 0) for i, start in enumerate(month_starts)], dtype=np.int64)
+    before = earlier - earlier[..., year_first]
+    net = calculate_net_batch(gross, points, percent[None, None, :, None], cap[None, None, :, None] - before)["net"]
+
+    return {
+        'months': [start.strftime('%Y-%m') for start in month_starts],
+        'scenarios': [
+            {
+                'wage': float(wage),
+                'rule': rule['name'],
+                'city': city,
+                'gross': gross[i, j, k].tolist(),
+                'net': net[i, j, k].tolist(),
+                'total_gross': round(float(gross[i, j, k].sum()), 2),
+                'total_net': round(float(net[i, j, k].sum()), 2),
+            }
+            for i, wage in enumerate(wages)
+            for j, rule in enumerate(rules)
+            for k, city in enumerate(cities)
+        ],
+    }
@@ -0,0 +1,119 @@
+# summaries.py
+# תחזוקה אינקרמנטלית של טבלת monthly_summaries - רק החודש שהשתנה מחושב מחדש
+from datetime import timedelta
+from models import db, Shift, MonthlySummary
+from months import month_key, month_bounds
+from overtime import week_start
+from shifts import refresh_shift_pay
+from tax_year import payslips_for_month, reset_totals
+from user_cache import bump_data_version, reload_user
+
+
+# שמירת תלוש שחושב ב-payslips_for_month בשורת הסיכום החודשי
+def store_payslip(payslip, summary=None):
+    if summary is None:
+        summary = MonthlySummary.query.filter_by(user_id=payslip["user_id"], month=payslip["month"]).first()
+
+    # אין יותר משמרות בחודש - אין צורך בסיכום
+    if payslip["shift_count"] == 0:
+        if summary:
+            db.session.delete(summary)
+        return None
+
+    if summary is None:
+        summary = MonthlySummary(user_id=payslip["user_id"], month=payslip["month"])
+        db.session.add(summary)
+
+    summary.shift_count = payslip["shift_count"]
+    summary.total_hours_100 = payslip["hours"]["100%"]
+    summary.total_hours_125 = payslip["hours"]["125%"]
+    summary.total_hours_150 = payslip["hours"]["150%"]
+    summary.total_hours_200 = payslip["hours"]["200%"]
+    summary.gross_salary = payslip["gross"]
+    summary.net_salary = payslip["net"]
+    summary.tax_deductions = {
+        "shabbat_hours": payslip["shabbat_hours"],
+        "credit_points": payslip["credit_points"],
+        "income_tax": payslip["income_tax"],
+        "credit": payslip["credit"],
+        "city_discount": payslip["city_discount"],
+        "national_insurance": payslip["national_insurance"],
+        "ytd_gross": payslip["ytd_gross"],
+        "ytd_income_tax": payslip["ytd_income_tax"],
+    }
+    return summary
+
+
+def refresh_monthly_summary(user, month):
+    payslip = payslips_for_month([user.id], month)[0]
+    return store_payslip(payslip)
+
+
+# משמרת משפיעה גם על המשמרות שאחריה באותו שבוע (שעות נוספות שבועיות),
+# ולכן כשהשבוע גולש לחודש הבא גם הוא מחושב מחדש. עמודות השכר של המשמרות באותם שבועות מתעדכנות יחד איתו.
+# תקרת היישוב המזכה נצברת לאורך שנת המס - גם החודשים המסוכמים שאחרי החודש הראשון שהשתנה באותה שנה
+# מחושבים מחדש, לפי הסדר, כך שכל אחד מתקדם מהמצטבר של קודמו.
+# כל שינוי במשמרות עובר כאן, ולכן כאן גם עולה גרסת הנתונים של המשתמש (מפתח המטמונים) - באותה טרנזקציה.
+# השכר השעתי, היישוב ושבוע העבודה שנשמרים עם המשמרות נקראים מהמסד ולא מהמשתמש שבמטמון
+def refresh_shift_months(user, days):
+    user = reload_user(user.id)
+    bump_data_version(user.id)
+    refresh_shift_pay(user, days)
+    months = set()
+    for day in days:
+        months.add(month_key(day))
+        months.add(month_key(week_start(day) + timedelta(days=6)))
+    for year in {month[:4] for month in months}:
+        first = min(month for month in months if month[:4] == year)
+        months.update(row[0] for row in db.session.query(MonthlySummary.month).filter(
+            MonthlySummary.user_id == user.id,
+            MonthlySummary.month > first,
+            MonthlySummary.month <= f'{year}-12'
+        ))
+    for month in sorted(months):
+        refresh_monthly_summary(user, month)
+
+
+# אחרי שינוי בפרטים האישיים: כל חודש שיש בו משמרות או סיכום מחושב מחדש באותה טרנזקציה, לפי הסדר
+# ומהמצטבר השנתי שנבנה מחדש - התלושים מציגים את אותו שכר כמו המשמרות. pay_changed - השכר השעתי,
+# היישוב או שבוע העבודה השתנו, וגם עמודות השכר של כל המשמרות מחושבות מחדש
+def refresh_all_months(user, pay_changed=True):
+    if pay_changed:
+        refresh_shift_pay(user)
+    reset_totals(user.id)
+    months = {month_key(row[0]) for row in db.session.query(Shift.date).filter(Shift.user_id == user.id).distinct()}
+    months.update(row[0] for row in db.session.query(MonthlySummary.month).filter(MonthlySummary.user_id == user.id))
+    for month in sorted(months):
+        refresh_monthly_summary(user, month)
+
+
+# חודשים שיש בהם משמרות ואין להם סיכום (משמרות שנוספו לפני טבלת הסיכומים) מחושבים ונשמרים בפעם
+# הראשונה שמבקשים אותם - לפי סדר החודשים, לכל המשתמשים של החודש יחד. user_ids=None - כל המשתמשים
+def fill_missing_summaries(user_ids, first_month, last_month):
+    start, end = month_bounds(first_month)[0], month_bounds(last_month)[1]
+    shifts = db.session.query(Shift.user_id, Shift.date).filter(Shift.date >= start, Shift.date < end)
+    stored = db.session.query(MonthlySummary.user_id, MonthlySummary.month).filter(
+        MonthlySummary.month >= first_month,
+        MonthlySummary.month <= last_month
+    )
+    if user_ids is not None:
+        shifts = shifts.filter(Shift.user_id.in_(user_ids))
+        stored = stored.filter(MonthlySummary.user_id.in_(user_ids))
+    missing = {(user_id, month_key(day)) for user_id, day in shifts.distinct()}
+    if not missing:
+        return
+    missing -= {(user_id, month) for user_id, month in stored}
+    if not missing:
+        return
+    for month in sorted({month for _, month in missing}):
+        for payslip in payslips_for_month(sorted(user_id for user_id, m in missing if m == month), month):
+            store_payslip(payslip)
+    db.session.commit()
+
+
+def get_monthly_summary(user_id, month):
+    summary = MonthlySummary.query.filter_by(user_id=user_id, month=month).first()
+    if summary is None:
+        fill_missing_summaries([user_id], month, month)
+        summary = MonthlySummary.query.filter_by(user_id=user_id, month=month).first()
+    return summary
@@ -0,0 +1,124 @@
+# tax_year.py
+# מצטבר שנתי לכל משתמש ושנת מס: ברוטו, מס שנוכה, נקודות זיכוי והכנסה שנוצלה מהתקרה של היישוב המזכה.
+# השורה מתקדמת חודש אחד בכל פעם, כך שחישוב חודש חדש קורא רק את המצטבר עד החודש הקודם ולא את כל
+# המשמרות של השנה. הסכומים בסוף כל חודש נשמרים (snapshots), וחישוב מחדש של חודש שכבר נצבר (עריכת משמרת)
+# חוזר אליהם בלי לקרוא שום דבר נוסף. רק חודשים חסרים שיש בהם משמרות מחושבים מהמשמרות, ושורה ישנה
+# בלי snapshots נבנית מחדש פעם אחת
+from datetime import date
+from models import db, Shift, TaxYearTotal
+from payslip import compute_payslips
+
+# שדות התלוש שנצברים - אותם שמות בתלוש (compute_payslips) ובטבלה
+ACCUMULATED = ("gross", "income_tax", "credit_points", "credit", "city_income", "city_discount")
+
+
+def _month(year, month_number):
+    return f"{year:04d}-{month_number:02d}"
+
+
+def _reset(total):
+    total.through_month = 0
+    total.snapshots = {}
+    for name in ACCUMULATED:
+        setattr(total, name, 0.0)
+
+
+# חודש בלי משמרות לא משנה את הסכומים - כמו הדילוג על חודשים כאלה ב-year_to_date
+def advance(totals, payslips, month_number):
+    for payslip in payslips:
+        total = totals[payslip["user_id"]]
+        if payslip["shift_count"]:
+            for name in ACCUMULATED:
+                setattr(total, name, round(getattr(total, name) + payslip[name], 2))
+            # מילון חדש - SQLAlchemy מזהה שינוי של עמודת JSON רק בהשמה
+            total.snapshots = dict(total.snapshots or {}, **{
+                str(month_number): {name: getattr(total, name) for name in ACCUMULATED}
+            })
+        total.through_month = month_number
+
+
+# חזרה לסוף החודש month_number מהסכומים שנשמרו: החודש האחרון שנצבר עד אליו, או אפס אם לא נצבר אף
+# חודש עם משמרות
+def rewind(total, month_number):
+    kept = {key: values for key, values in total.snapshots.items() if int(key) <= month_number}
+    last = kept[max(kept, key=int)] if kept else {}
+    for name in ACCUMULATED:
+        setattr(total, name, last.get(name, 0.0))
+    total.snapshots = kept
+    total.through_month = month_number
+
+
+# השלמת החודשים שחסרים לכל משתמש עד through_month, מהמקום שבו המצטבר שלו עומד -
+# לכל חודש תלושים אחד לכל המשתמשים שעוד לא הגיעו אליו
+def catch_up(totals, user_ids, year, through_month):
+    if not user_ids:
+        return
+    for month_number in range(min(totals[user_id].through_month for user_id in user_ids) + 1, through_month + 1):
+        due = [user_id for user_id in user_ids if totals[user_id].through_month < month_number]
+        advance(totals, compute_payslips(due, _month(year, month_number), totals), month_number)
+
+
+# חישוב מחדש מהמשמרות: החודשים 1..through_month, חודש אחרי חודש, לכל המשתמשים יחד
+def rebuild(totals, user_ids, year, through_month):
+    for user_id in user_ids:
+        _reset(totals[user_id])
+    catch_up(totals, user_ids, year, through_month)
+
+
+# משתמשים שאין להם משמרות בחודשים שבין המצטבר לחודש המבוקש - החודשים האלה לא משנים את הסכומים
+def _users_with_shifts(user_ids, first, last):
+    return {row[0] for row in db.session.query(Shift.user_id).filter(
+        Shift.user_id.in_(user_ids),
+        Shift.date >= first,
+        Shift.date < last
+    ).distinct()}
+
+
+# המצטבר של כל משתמש עד סוף החודש שלפני month (YYYY-MM); שורות חסרות נוצרות, חודשים שכבר נצברו
+# מוחזרים לאחור, ורק חודשים חסרים שיש בהם משמרות מחושבים מהמשמרות
+def year_to_date(user_ids, month):
+    year, month_number = int(month[:4]), int(month[5:7])
+    totals = {
+        total.user_id: total
+        for total in TaxYearTotal.query.filter(TaxYearTotal.user_id.in_(user_ids), TaxYearTotal.tax_year == year)
+    }
+    for user_id in user_ids:
+        if user_id not in totals:
+            totals[user_id] = TaxYearTotal(user_id=user_id, tax_year=year)
+            _reset(totals[user_id])
+            db.session.add(totals[user_id])
+
+    # חודש שכבר נצבר מחושב מחדש: חוזרים לסוף החודש שלפניו. שורה ישנה בלי snapshots מתחילה מאפס
+    for user_id in user_ids:
+        total = totals[user_id]
+        if total.snapshots is None:
+            _reset(total)
+        elif total.through_month >= month_number:
+            rewind(total, month_number - 1)
+
+    behind = [user_id for user_id in user_ids if totals[user_id].through_month < month_number - 1]
+    if behind:
+        first = min(totals[user_id].through_month for user_id in behind) + 1
+        busy = _users_with_shifts(behind, date(year, first, 1), date(year, month_number, 1))
+        for user_id in behind:
+            if user_id not in busy:
+                totals[user_id].through_month = month_number - 1
+        catch_up(totals, [user_id for user_id in behind if user_id in busy], year, month_number - 1)
+    return totals
+
+
+# תלושי החודש על בסיס המצטבר, והתקדמות המצטבר לחודש הזה. השמירה (commit) באחריות הקורא
+def payslips_for_month(user_ids, month):
+    totals = year_to_date(user_ids, month)
+    payslips = compute_payslips(user_ids, month, totals)
+    advance(totals, payslips, int(month[5:7]))
+    for payslip in payslips:
+        total = totals[payslip["user_id"]]
+        payslip["ytd_gross"] = total.gross
+        payslip["ytd_income_tax"] = total.income_tax
+    return payslips
+
+
+# אחרי שינוי שמשפיע על כל השנה (שכר, יישוב) - המצטברים ייבנו מחדש בחישוב הבא
+def reset_totals(user_id):
+    TaxYearTotal.query.filter_by(user_id=user_id).delete()
@@ -0,0 +1,101 @@
+# user_cache.py
+# מטמון למשתמש המחובר: user_loader רץ בכל בקשה, ובלי מטמון כל בקשה (וכל קריאת XHR) מתחילה
+# בשאילתה על users ואחריה שאילתה על children. המשתמש והילדים נטענים יחד פעם אחת,
+# נשמרים כערכי עמודות (JSON), ומוצמדים ל-session בלי SELECT (merge עם load=False).
+# כל שינוי בנתוני המשתמש מוחק את הרשומה מהמטמון אחרי ה-commit (bump_data_version). עם Redis
+# המחיקה נראית בכל התהליכים, ופגיעה במטמון לא נוגעת במסד בכלל; במטמון בזיכרון התהליך אין לתהליך
+# אחר דרך לדעת על המחיקה, ולכן נבדקת מול המסד גרסת הנתונים (users.data_version) בשאילתה צרה
+import copy
+from datetime import date
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session, selectinload, make_transient_to_detached
+from cache import ConfiguredCache
+from models import db, User, Child
+
+
+# הסיסמה לא נשמרת במטמון: היא נטענת מהמסד רק כשניגשים אליה (התחברות)
+def _columns(model):
+    return [column.key for column in model.__table__.columns if column.key != 'password']
+
+
+def _date_columns(model):
+    return {column.key for column in model.__table__.columns if isinstance(column.type, db.Date)}
+
+
+USER_COLUMNS = _columns(User)
+CHILD_COLUMNS = _columns(Child)
+USER_DATES = _date_columns(User)
+CHILD_DATES = _date_columns(Child)
+
+_get_cache = ConfiguredCache('USER_CACHE', 'user:')
+
+
+def _dump(obj, columns):
+    values = {key: getattr(obj, key) for key in columns}
+    return {key: value.isoformat() if isinstance(value, date) else value for key, value in values.items()}
+
+
+def _load(values, dates):
+    return {key: date.fromisoformat(value) if key in dates and value else value for key, value in values.items()}
+
+
+def _snapshot(user):
+    return {
+        'user': _dump(user, USER_COLUMNS),
+        'children': [_dump(child, CHILD_COLUMNS) for child in user.children],
+    }
+
+
+def _restore(snapshot):
+    # עותק עמוק - שינוי של שדה JSON באובייקט לא ישנה את הערך שבמטמון
+    snapshot = copy.deepcopy(snapshot)
+    user = User(**_load(snapshot['user'], USER_DATES))
+    user.children = [Child(**_load(values, CHILD_DATES)) for values in snapshot['children']]
+    # האובייקטים נבנו מערכים שכבר שמורים במסד - מסמנים אותם כטעונים ולא כחדשים
+    # (עמודה שלא נשמרה, כמו הסיסמה, מסומנת כפגת תוקף ונטענת בגישה הראשונה)
+    for child in user.children:
+        make_transient_to_detached(child)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def load_user(user_id):
+    cache = _get_cache()
+    snapshot = cache.get(str(user_id))
+    if snapshot is not None and (cache.shared or snapshot['user']['data_version'] == db.session.query(
+            User.data_version).filter(User.id == user_id).scalar()):
+        return _restore(snapshot)
+
+    user = db.session.get(User, user_id, options=[selectinload(User.children)])
+    if user is not None:
+        cache.set(str(user.id), _snapshot(user))
+    return user
+
+
+# נתיבי כתיבה ששומרים שכר (משמרות, פרטים אישיים) קוראים את המשתמש מהמסד ולא מהמטמון -
+# populate_existing מעדכן את אותו אובייקט שכבר נמצא ב-session (current_user)
+def reload_user(user_id):
+    return db.session.get(User, user_id, populate_existing=True)
+
+
+# נקרא בתוך הטרנזקציה של כל שינוי בנתוני המשתמש, לפני ה-commit. הגרסה החדשה (מפתח מטמון הקטעים)
+# נשמרת יחד עם הנתונים, והרשומה במטמון נמחקת עכשיו ושוב אחרי ה-commit - בקשה מקבילה שקראה את
+# הנתונים הישנים בינתיים לא משאירה אותם במטמון
+def bump_data_version(user_id):
+    db.session.execute(update(User).where(User.id == user_id).values(data_version=User.data_version + 1))
+    db.session.info.setdefault('stale_users', set()).add(user_id)
+    _get_cache().delete(str(user_id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_stale_users(session):
+    stale = session.info.pop('stale_users', None)
+    if stale:
+        cache = _get_cache()
+        for user_id in stale:
+            cache.delete(str(user_id))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_stale_users(session):
+    session.info.pop('stale_users', None)
@@ -0,0 +1,6 @@
+# wsgi.py
+# נקודת הכניסה לשרת הייצור: gunicorn -c gunicorn.conf.py wsgi:app
+# כל תהליך עובד בונה את האפליקציה בעצמו ופותח מאגר חיבורים משלו
+from app import create_app
+
+app = create_app()